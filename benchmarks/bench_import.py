@@ -0,0 +1,92 @@
+"""
+Import time check for scripty_plotter.
+
+In fresh python processes, times `import scripty_plotter`, making a plotHolder and
+finding the files in a small synthetic directory, and checks that none of that
+imported plotly, pandas or numpy (they're only needed once it plots).
+Exits non-zero if the median import time goes over --max-seconds, or the heavy
+modules got imported, so it can be used as a regression check.
+
+Run from the repo root:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 20 --max-seconds 0.2
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+import py_compile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+HEAVY = ("plotly", "pandas", "numpy")
+
+CHILD = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import scripty_plotter
+imported = time.perf_counter() - start
+holder = scripty_plotter.plotHolder()
+holder.cwd = {directory!r}
+import logging
+logging.getLogger("scripty_plotter").setLevel(logging.WARNING)
+files = holder.getFileList()
+discovered = time.perf_counter() - start
+print(json.dumps({{'import': imported, 'discovery': discovered, 'files': len(files),
+    'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+HEAVY_CHILD = """
+import time
+start = time.perf_counter()
+import plotly.graph_objects, pandas, numpy
+print(time.perf_counter() - start)
+"""
+
+
+def runChild(code):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=0.25, help="fail if the median import takes longer")
+    args = parser.parse_args()
+
+    py_compile.compile(os.path.join(ROOT, "scripty_plotter.py")) ##time the import, not the compile
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(20):
+            with open(os.path.join(directory, f"run{i:03d}__bench_summary.csv"), "w") as f:
+                f.write("x,y\n0,0\n1,1\n")
+        results = [json.loads(runChild(CHILD.format(root=ROOT, directory=directory, heavy=HEAVY)))
+            for _ in range(args.repeat)]
+
+    imports = statistics.median(r['import'] for r in results)
+    discovery = statistics.median(r['discovery'] for r in results)
+    heavy = sorted({m for r in results for m in r['heavy']})
+    plotting_imports = float(runChild(HEAVY_CHILD))
+
+    print(f"import scripty_plotter          {imports*1000:>8.1f} ms (median of {args.repeat})")
+    print(f"  + plotHolder and getFileList   {discovery*1000:>8.1f} ms")
+    print(f"plotly + pandas + numpy (for reference) {plotting_imports*1000:>8.1f} ms")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: {', '.join(heavy)} imported before plotting")
+        failed = True
+    if imports > args.max_seconds:
+        print(f"FAIL: import took longer than {args.max_seconds*1000:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
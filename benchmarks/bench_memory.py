@@ -0,0 +1,105 @@
+"""
+Memory check for plotHolder - peak and retained python memory (tracemalloc) of .plot()
+against the size of the numbers in the files, as float64.
+
+Each case is run both ways, each in a fresh python process:
+  eager - the default .plot(), which builds the plotly figure too. The figure holds its own
+          (deep) copy of every trace, and plotly loads ~10MB of validator tables the first
+          time, so small runs come out several times the raw data size.
+  lazy  - .plot() with holder.lazy = True, just the traces (the figure is built when it's used)
+Exits non-zero if either peak goes over its limit (--max-ratio / --max-lazy-ratio times
+the raw data size), so it can be used as a regression check:
+
+Run from the repo root:
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py 200x5000x20 --max-ratio 12 --max-lazy-ratio 2
+(files x rows per file x extra columns)
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+
+def measure(directory, lazy):
+    #Runs in the child process
+    import gc
+    import logging
+    import tracemalloc
+    import pandas as pd
+    import scripty_plotter
+    import synthetic
+    logging.getLogger("scripty_plotter").setLevel(logging.WARNING)
+
+    holder = scripty_plotter.plotHolder()
+    holder.cwd = directory
+    holder.split_dataset_function = synthetic.splitUpDown
+    holder.y_err_plus, holder.y_err_minus = 'y_err_p', 'y_err_m'
+    holder.x_err_plus, holder.x_err_minus = 'x_err_p', 'x_err_m'
+    holder.shaded_y_error = True
+    holder.lazy = lazy
+
+    files = holder.getFileList()
+    numeric = pd.read_csv(files[0]).select_dtypes('number').shape[1]
+    rows = sum(len(pd.read_csv(f, usecols=[0])) for f in files)
+    raw = rows*numeric*8
+
+    gc.collect()
+    tracemalloc.start()
+    holder.plot()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    traces = sum(t.nbytes() for record in holder._file_records.values() for t in record['traces'])
+    return {'raw_bytes': raw, 'peak_bytes': peak, 'retained_bytes': retained, 'trace_bytes': traces}
+
+
+def runCase(n_files, rows, extra_columns):
+    #{'eager': results, 'lazy': results}
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        import synthetic
+        synthetic.makeRun(directory, n_files, rows, extra_columns=extra_columns)
+        for mode in ("eager", "lazy"):
+            out = subprocess.run([sys.executable, __file__, "--child", directory] + (["--lazy"] if mode == "lazy" else []),
+                capture_output=True, text=True, check=True)
+            results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", help="files x rows x extra columns, e.g. 200x5000x20")
+    parser.add_argument("--max-ratio", type=float, default=10.0, help="fail if the eager peak > this x raw data size")
+    parser.add_argument("--max-lazy-ratio", type=float, default=3.0, help="fail if the lazy peak > this x raw data size")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--lazy", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.lazy)))
+        return 0
+
+    cases = [tuple(int(v) for v in c.split("x")) for c in args.cases] or [(200, 2000, 0), (50, 20000, 20)]
+    limits = {'eager': args.max_ratio, 'lazy': args.max_lazy_ratio}
+    failed = False
+    print(f"{'case':>16} {'mode':>6} {'raw MB':>8} {'peak MB':>8} {'kept MB':>8} {'traces MB':>9} {'peak/raw':>9}")
+    for n_files, rows, extra_columns in cases:
+        for mode, result in runCase(n_files, rows, extra_columns).items():
+            ratio = result['peak_bytes']/result['raw_bytes']
+            failed |= ratio > limits[mode]
+            print(f"{n_files:>5}x{rows:<6}x{extra_columns:<3} {mode:>6} {result['raw_bytes']/1e6:>8.1f} {result['peak_bytes']/1e6:>8.1f}"
+                f" {result['retained_bytes']/1e6:>8.1f} {result['trace_bytes']/1e6:>9.1f} {ratio:>9.2f}"
+                + ("  <- over the limit" if ratio > limits[mode] else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Compare the svg (Scatter) and webgl (Scattergl) render backends of plotHolder.
+
+For each directory size, times .plot() and the html write with each backend,
+and reports the html size (plotly.js referenced from the cdn, so it's just the figure).
+
+Run from the repo root:
+    python benchmarks/bench_render_backend.py
+    python benchmarks/bench_render_backend.py 100x1000 500x200
+(files x rows per file)
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scripty_plotter
+from synthetic import makeRun
+
+
+def timeBackend(directory, backend):
+    holder = scripty_plotter.plotHolder()
+    holder.cwd = directory
+    holder.y_err_plus = 'y_err_p'
+    holder.y_err_minus = 'y_err_m'
+    holder.shaded_y_error = True
+    holder.render_backend = backend
+
+    start = time.perf_counter()
+    holder.plot()
+    build = time.perf_counter() - start
+
+    out = os.path.join(directory, f"out_{backend}.html")
+    start = time.perf_counter()
+    holder.fig.write_html(out, include_plotlyjs='cdn')
+    write = time.perf_counter() - start
+    return build, write, os.path.getsize(out)
+
+
+def main(cases):
+    logging.getLogger("scripty_plotter").setLevel(logging.WARNING) ##hide the progress messages
+    print(f"{'case':>12} {'backend':>8} {'build s':>9} {'write s':>9} {'html MB':>9}")
+    for n_files, rows in cases:
+        with tempfile.TemporaryDirectory() as d:
+            makeRun(d, n_files, rows, splits=False)
+            for backend in ("svg", "webgl"):
+                build, write, size = timeBackend(d, backend)
+                print(f"{n_files:>5}x{rows:<6} {backend:>8} {build:>9.2f} {write:>9.2f} {size/1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    cases = [tuple(int(v) for v in a.split("x")) for a in sys.argv[1:]] or [(10, 10000), (100, 1000), (500, 200)]
+    main(cases)
@@ -0,0 +1,49 @@
+"""
+Rough benchmark of how plotHolder.plot scales with the number of files.
+
+Makes a temporary directory of small synthetic *summary.csv files for each size,
+and times a full .plot() on it (error bars and shaded bands on, so every trace
+gets the full treatment).
+
+Run from the repo root:
+    python benchmarks/bench_trace_build.py
+    python benchmarks/bench_trace_build.py 10 100 1000
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scripty_plotter
+from synthetic import makeRun
+
+
+def timePlot(directory):
+    holder = scripty_plotter.plotHolder()
+    holder.cwd = directory
+    holder.y_err_plus = 'y_err_p'
+    holder.y_err_minus = 'y_err_m'
+    holder.shaded_y_error = True
+
+    start = time.perf_counter()
+    holder.plot()
+    return time.perf_counter() - start, len(holder.fig.data)
+
+
+def main(sizes):
+    logging.getLogger("scripty_plotter").setLevel(logging.WARNING) ##hide the progress messages
+    print(f"{'files':>8} {'traces':>8} {'seconds':>10} {'ms/file':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as d:
+            makeRun(d, n, rows=50, splits=False)
+            seconds, n_traces = timePlot(d)
+        print(f"{n:>8} {n_traces:>8} {seconds:>10.2f} {1000*seconds/n:>10.2f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 5000]
+    main(sizes)
@@ -0,0 +1,145 @@
+"""
+Benchmark suite for scripty_plotter.
+
+Each case makes a synthetic directory (see synthetic.py), then in a fresh python
+process times file discovery, loading, trace building, e-band construction and
+html export, and records the peak RSS and the html size. Results are saved as
+json so runs can be compared:
+
+    python benchmarks/run_benchmarks.py -o before.json
+    ...change things...
+    python benchmarks/run_benchmarks.py -o after.json --compare before.json
+
+    python benchmarks/run_benchmarks.py --quick          ##small cases only
+    python benchmarks/run_benchmarks.py --case many_files ##just one case
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+#name: (files, rows per file, extra columns, Up/Down splits, error columns, quick)
+CASES = {
+    'small':        dict(files=10,   rows=200,    extra_columns=0,   splits=True,  error_columns=True,  quick=True),
+    'many_files':   dict(files=2000, rows=50,     extra_columns=0,   splits=True,  error_columns=True,  quick=False),
+    'long_files':   dict(files=10,   rows=200000, extra_columns=0,   splits=False, error_columns=True,  quick=False),
+    'wide_files':   dict(files=50,   rows=2000,   extra_columns=200, splits=True,  error_columns=True,  quick=False),
+    'no_errors':    dict(files=200,  rows=500,    extra_columns=0,   splits=False, error_columns=False, quick=True),
+}
+
+
+def runCase(directory, case):
+    #Runs in the child process - returns the measurements as a dict
+    import logging
+    import scripty_plotter
+    import synthetic
+    logging.getLogger("scripty_plotter").setLevel(logging.WARNING)
+
+    holder = scripty_plotter.plotHolder()
+    holder.cwd = directory
+    if case['splits']:
+        holder.split_dataset_function = synthetic.splitUpDown
+        holder.custom_markers_dict = {'_u': 'triangle-right', '_d': 'triangle-left'}
+    if case['error_columns']:
+        holder.y_err_plus, holder.y_err_minus = 'y_err_p', 'y_err_m'
+        holder.x_err_plus, holder.x_err_minus = 'x_err_p', 'x_err_m'
+        holder.shaded_y_error = True
+    holder.title = "benchmark"
+
+    holder.plot()
+    stages = dict(holder.report.stages)
+
+    out_file = os.path.join(directory, "benchmark.html")
+    start = time.perf_counter()
+    holder.draw(out_file)
+    stages['export'] = time.perf_counter() - start
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == "darwin" else peak*1024
+    return {
+        'seconds': stages,
+        'counts': holder.report.counts,
+        'peak_rss_bytes': peak,
+        'html_bytes': os.path.getsize(out_file),
+    }
+
+
+def runInSubprocess(name, case):
+    #fresh process per case, so peak RSS is just that case
+    with tempfile.TemporaryDirectory() as directory:
+        import synthetic
+        synthetic.makeRun(directory, case['files'], case['rows'], case['extra_columns'],
+            case['splits'], case['error_columns'])
+        out = subprocess.run([sys.executable, __file__, "--child", directory, json.dumps(case)],
+            capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"case {name} failed:\n{out.stderr}")
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def printResults(results, baseline=None):
+    stages = ['discovery', 'ingest', 'traces', 'ebands', 'figure', 'layout', 'export']
+    print(f"{'case':<12}" + "".join(f"{s:>10}" for s in stages) + f"{'RSS MB':>9}{'html MB':>9}")
+    for name, r in results.items():
+        print(f"{name:<12}" + "".join(f"{r['seconds'].get(s, 0):>10.3f}" for s in stages)
+            + f"{r['peak_rss_bytes']/1e6:>9.1f}{r['html_bytes']/1e6:>9.2f}")
+        if baseline and name in baseline:
+            b = baseline[name]
+            ratios = []
+            for s in stages:
+                old = b['seconds'].get(s, 0)
+                ratios.append(f"{(r['seconds'].get(s, 0)/old if old else float('nan')):>9.2f}x")
+            print(f"{'  vs base':<12}" + "".join(f"{x:>10}" for x in ratios)
+                + f"{r['peak_rss_bytes']/b['peak_rss_bytes']:>8.2f}x{r['html_bytes']/b['html_bytes']:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="save results as json here")
+    parser.add_argument("--compare", help="json from an earlier run to compare against")
+    parser.add_argument("--quick", action="store_true", help="only the quick cases")
+    parser.add_argument("--case", action="append", help="only this case (can repeat)")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        directory, case = args.child
+        print(json.dumps(runCase(directory, json.loads(case))))
+        return
+
+    names = args.case or [n for n, c in CASES.items() if c['quick'] or not args.quick]
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = runInSubprocess(name, CASES[name])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    printResults(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'cases': {n: CASES[n] for n in names},
+                'results': results,
+            }, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
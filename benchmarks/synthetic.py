@@ -0,0 +1,71 @@
+"""
+Synthetic *summary.csv directories, for benchmarks and demos.
+
+Each file looks like a lab summary export: an x sweep, a y reading, optional
+error columns, optional Up/Down sweeps (an 'LP-Test Name' column) and any number
+of extra junk columns to make it wide.
+
+    python benchmarks/synthetic.py demo_data --files 20 --rows 200
+"""
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+def makeFile(path, rows=200, extra_columns=0, splits=True, error_columns=True, seed=0):
+    rng = np.random.default_rng(seed)
+    if splits:
+        half = rows//2
+        x = np.concatenate([np.linspace(0, 10, half), np.linspace(10, 0, rows-half)])
+        names = ['Up']*half + ['Down']*(rows-half)
+    else:
+        x = np.linspace(0, 10, rows)
+        names = None
+
+    df = pd.DataFrame({
+        'x': x,
+        'y': np.sin(x + seed*0.1) + rng.normal(0, 0.02, rows) + (0.05 if splits else 0)*np.sign(np.gradient(x)),
+    })
+    if names is not None:
+        df['LP-Test Name'] = names
+    if error_columns:
+        df['y_err_p'] = np.abs(rng.normal(0.05, 0.01, rows))
+        df['y_err_m'] = np.abs(rng.normal(0.05, 0.01, rows))
+        df['x_err_p'] = np.full(rows, 0.01)
+        df['x_err_m'] = np.full(rows, 0.01)
+    for i in range(extra_columns):
+        df[f'extra{i:03d}'] = rng.random(rows)
+    df.to_csv(path, index=False)
+
+
+def makeRun(directory, n_files=10, rows=200, extra_columns=0, splits=True, error_columns=True):
+    #A directory of n_files synthetic summary files, with increasing modified times.
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n_files):
+        path = os.path.join(directory, f"run{i:05d}__synthetic_summary.csv")
+        makeFile(path, rows, extra_columns, splits, error_columns, seed=i)
+        os.utime(path, ns=(1_600_000_000_000_000_000 + i*1_000_000_000,)*2) ##so oldest-first order is stable
+        paths.append(path)
+    return paths
+
+
+def splitUpDown(df):
+    #split on the sweep direction column - module level, so it can go to worker processes
+    return {'_u': df[df['LP-Test Name'] == 'Up'], '_d': df[df['LP-Test Name'] == 'Down']}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--extra-columns", type=int, default=0)
+    parser.add_argument("--no-splits", action="store_true")
+    parser.add_argument("--no-errors", action="store_true")
+    args = parser.parse_args()
+    makeRun(args.directory, args.files, args.rows, args.extra_columns, not args.no_splits, not args.no_errors)
+    print(f"Wrote {args.files} files to {args.directory}")
@@ -41,12 +41,63 @@ It can be easily done with a limits csv file too, though it won't be preprocesse
 import os
 import sys
 import re
-
-import plotly
-import pandas as pd
-
-
-import csv
+import io
+import time
+import logging
+import contextlib
+import tracemalloc
+import heapq
+import pickle
+import fnmatch
+import threading
+import gzip
+import base64
+import hashlib
+import json
+import functools
+import importlib
+import concurrent.futures
+
+
+class _lazyModule():
+    #Stands in for a module, importing it the first time anything is used from it.
+    #plotly, pandas and numpy take around a second to import between them - this way
+    #`import scripty_plotter` (and finding files, settings etc.) doesn't pay for that until it plots.
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self.__dict__['_name']!r}>"
+
+    def __reduce__(self):
+        return (_lazyModule, (self.__dict__['_name'],))
+
+plotly = _lazyModule("plotly")
+pd = _lazyModule("pandas")
+np = _lazyModule("numpy")
+
+#plotly.colors.qualitative.Plotly - written out, so making a plotHolder doesn't import plotly
+default_colours = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+
+#Progress messages go through logging, so they only show once the script sets it up, e.g.
+#logging.basicConfig(level=logging.INFO, format="%(message)s") (or DEBUG for more). main() does that.
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
 
 
 class plotHolder():
@@ -63,6 +114,14 @@ class plotHolder():
             
         #Manual file list will override any logic following:
         self.fileList = None
+
+        #Look in subdirectories of cwd too - up to max_depth levels down (None = all the way)
+        self.recursive = False
+        self.max_depth = None
+        #if defined, only go into subdirectories with names matching this glob - e.g. "2021-*"
+        self.subdir_glob = None
+        #if defined, only the newest n files (post filtering) are used
+        self.newest_n = None
         
         #For autogen a file list:
         #Permit only these matching files:
@@ -93,6 +152,54 @@ class plotHolder():
 
         self.split_dataset_function = do_not_split
 
+        #Number of parallel workers used to read, split and preprocess the files.
+        #None (or 1) does it all in this process, one file at a time.
+        #Results always come back in fileList order, so colours/legend are unchanged.
+        self.workers = None
+        #'process' or 'thread' - processes need the split/custom functions to be picklable
+        #(i.e. module level functions, not lambdas) - otherwise threads are used instead.
+        self.worker_type = "process"
+
+        #Extra keyword arguments to pd.read_csv, e.g. {'skiprows': 2}
+        #(these win over the reader settings below)
+        self.read_csv_kwargs = {}
+
+        ##Reader settings - see .readerOptions
+        #Only parse these columns - a list, or "auto" for the x/y/error columns, extra_columns,
+        #and any .columns declared by the split/custom functions. None = every column.
+        self.usecols = None
+        #Any other columns the split/custom functions need, for usecols="auto" - e.g. ['LP-Test Name']
+        self.extra_columns = []
+        #dtype for the x/y/error columns, e.g. "float32" (None = let pandas work it out)
+        self.column_dtype = None
+        #pd.read_csv engine - None (pandas default), 'c', 'python', 'pyarrow', or "auto" (pyarrow if installed)
+        self.csv_engine = None
+        #Memory map the files when reading (not with pyarrow)
+        self.memory_map = False
+
+        #Files that have already been read - {frameKey(path, reader options): dataframe}
+        #Used instead of reading them again (set by plotSession). Treated as read-only -
+        #custom_column_function should copy (like noop does) rather than change them in place.
+        self.frame_source = None
+
+        #Optional on-disk cache of the parsed files - e.g. ".plotcache"
+        #Entries are keyed on path, modified time, size and the reader options, so any change re-reads.
+        self.cache_dir = None
+        #Least recently used entries are removed once the cache is bigger than this
+        self.cache_max_bytes = 1e9
+        #'pickle', or 'parquet'/'feather' (need pyarrow)
+        self.cache_format = "pickle"
+        #Filled in by .plot, {'hits': n, 'misses': n}
+        self.cache_stats = None
+
+        #Optional single columnar file holding every file of the run - e.g. "run.parquet" (see runStore)
+        #One file to open instead of thousands. The file name regexes etc. are checked against the
+        #list of files inside it, and only the matching files' rows are read out of it.
+        self.store = None
+        #Bring the store up to date with the csv files first (only new/changed files are read).
+        #False just plots what is in the store - e.g. when the csv files aren't around any more.
+        self.store_refresh = True
+
         #For use with split datasets - key is the same as split dataset dict key
         #e.g. {'_u':'triangle-right','_d':'triangle-left'}
         self.custom_markers_dict = None
@@ -115,14 +222,52 @@ class plotHolder():
 
         self.shaded_y_error = False
 
+        #'svg' (plain Scatter), 'webgl' (Scattergl - far quicker with lots of lines/points)
+        #or 'auto' - webgl once there are more than webgl_point_threshold points in total.
+        self.render_backend = "svg"
+        self.webgl_point_threshold = 100000
+
+        #Max points per line - longer lines are thinned down to this (None = plot every point)
+        #Error bars/bands are thinned along with them, the full data ends up in self.full_data
+        self.max_points_per_trace = None
+        #Read files this many rows at a time (None = all at once) - for files bigger than memory.
+        #Each chunk is split, preprocessed and thinned (to max_points_per_trace, or 10000) straight away,
+        #so only the thinned lines are kept. (the cache, frame_source and full_data aren't used)
+        self.chunksize = None
+        #'lttb' (largest triangle three buckets - keeps the shape) or 'minmax' (keeps every peak)
+        self.downsample_method = "lttb"
+
+        #Faceting - a grid of panels (make_subplots) in the one figure, sharing axes and colours.
+        #facet says which panel each line goes in: 'split' (one per split, e.g. _u and _d),
+        #a regex on the line name (first capture group if any), or a function given the line's
+        #Scatter arguments that returns its panel name.
+        self.facet = None
+        #Or/and stack several y columns in rows on a shared x axis - e.g. ['y', 'MEAN-Adc'] (instead of y_col)
+        self.facet_y_cols = None
+        #Panels per row for facet (None = about square). Not used with facet_y_cols (facet panels go across)
+        self.facet_columns = None
+
+        #Aggregation - rather than a line per file, group the files by this regex on the file name
+        #(the first capture group if it has one, e.g. re.compile(r"^(.+?)_run\d+")), and plot one line
+        #and shaded band per group (per split), with the lines interpolated onto aggregate_points x values.
+        self.aggregate_regex = None
+        #The line - 'mean' or 'median'
+        self.aggregate_stat = "mean"
+        #The band - 'minmax', 'std' (the mean +- one standard deviation) or percentiles, e.g. (10, 90)
+        self.aggregate_band = "minmax"
+        self.aggregate_points = 200
+
         self.group_derivative_plots_together = False
         self.toggle_derivative_plots_together = False
 
-        self.colourSequence = plotly.colors.qualitative.Plotly
+        self.colourSequence = default_colours ##plotly's default colours (plotly.colors.qualitative.Plotly)
         #default colours go: 
         #['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
-        ##will ideally accept arbitrary inputs here - e.g. red, blue, turquoise.
+        #Any colours will do - e.g. ['red', '#00CC96', 'rgb(171, 99, 250)'], the name of a plotly sequence
+        #("D3", "Set1"...) or a colourPalette. They go round again if there are more files than colours.
         ##https://plotly.com/python-api-reference/generated/plotly.colors.html
+        #Or spread the colours along a continuous scale instead (one per file/group) - e.g. "Viridis"
+        self.colour_scale = None
 
 
         ##Will default down the line to be x_col and y_col if not defined later
@@ -139,151 +284,185 @@ class plotHolder():
 
         #self.fileList = listFiles(self.cwd)
 
-    def plot(self):
+        #For .draw - where the html goes (None = named after the title)
+        self.out_file = None
+        #How the html gets plotly.js - 'directory': one shared plotly-<version>.min.js next to the html files,
+        #'cdn': fetched from the internet, True: embedded in every file (~3.5MB each)
+        self.include_plotlyjs = "directory"
+        #Store the plotted numbers as float32 - half the size, ~7 significant figures
+        #(arrays are always binary encoded with plotly 6+, rather than written out as text)
+        self.compact_arrays = False
+        #Write .html.gz
+        self.gzip_html = False
+
+        #For .watch - seconds between checks for new/changed files,
+        #and how long things must be quiet before redrawing (so a burst of writes is one redraw)
+        self.watch_interval = 1.0
+        self.watch_debounce = 2.0
+        #When polling (no watchdog installed), only the newest few files are checked every time,
+        #plus the directory itself for new/removed files. Everything is rechecked this often (in polls).
+        self.watch_hot_files = 10
+        self.watch_full_rescan_every = 60
+
+        ##Instrumentation - .plot fills in self.report (a plotReport) with timings per stage and file,
+        #counts, and peak memory. Stages: plot (the lot), discovery, ingest, traces, ebands, figure, layout
+        self.report = None
+        #Called as stage_callback(stage_name, seconds, report) as each stage finishes
+        self.stage_callback = None
+        #Run this stage under cProfile (stats end up in self.report.profiles[stage])
+        self.profile_stage = None
+        #Track this plot's peak python memory with tracemalloc (slower) - otherwise only the process's peak RSS is recorded
+        self.trace_memory = False
+
+        #Lazy mode - .plot only works out the traces (self.plan), the plotly figure is built when
+        #self.fig is first used (.show, .draw etc.) - so a figure that's never looked at costs nothing,
+        #and only the traces that pass trace_filter are ever made into plotly objects.
+        self.lazy = False
+        #Only plot the traces this returns True for - called with each trace's Scatter arguments,
+        #e.g. lambda trace: trace['name'].endswith('_u'). Lazy plots can change it, then .materialise()
+        self.trace_filter = None
+        #The Scatter arguments of every trace, in drawing order (set by .plot)
+        self.plan = None
+        self._fig = None
+        self._scatter = None
+        self._facet_grid = None ##make_subplots arguments, if faceted
+
+        #Bookkeeping for incremental plots - which files have been read, and their lines
+        self._file_records = {}
+        self._auto_file_list = False
+        self._scan_signatures = {} ##{path: signature} from the last getFileList, so plot needn't stat again
+
+    def plot(self, incremental=False):
         #Finish and build a graph as defined in the rest of the class.
-
+        #incremental - only read the files that are new or changed since the last .plot
+        # (by modified time and size), reusing the lines from before for the rest.
+        # Deleted files drop out. The figure still comes out the same as a full rebuild.
+        # (Assumes the other settings haven't changed - do a plain .plot if they have.)
+        #How long each part took etc. ends up in self.report (a plotReport)
+        report = plotReport(callback=self.stage_callback, profile_stage=self.profile_stage,
+            trace_memory=self.trace_memory)
+        self.report = report
+        with report.stage("plot"):
+            self._plot(incremental, report)
+        report.finish()
+        log.info(f"Done - {report.counts['lines']} lines, {report.counts['points']} points"
+            f" from {report.counts['files']} files in {report.stages['plot']:.2f}s")
+        log.debug(report.summary())
+
+    def _plot(self, incremental, report):
         ## allow overriding the file list externally.
-        if self.fileList == None:
-            self.fileList = self.getFileList()
+        self._scan_signatures = {}
+        if self.fileList == None or (incremental and self._auto_file_list):
+            with report.stage("discovery"):
+                self.fileList = self.findFiles()
+            self._auto_file_list = True
+        if self.store != None and self.store_refresh:
+            with report.stage("store"):
+                self.compact(files=self.fileList)
 
         #print(self.fileList)
 
         pd.options.plotting.backend = "plotly"
-        self.fig = plotly.graph_objects.Figure()
-        self.fig.update_layout(title=self.title)
-        
-        rgba = [hex_rgba(c, transparency=1.0) for c in self.colourSequence]
-        colourCycle = ['rgba'+str(elem) for elem in rgba]
-
-        line_color=next_in_looped_list(colourCycle)
-        #print(self.colourSequence)
-        #exit()
+        self._fig = None
         
 
-
-        print("Plotting: ", end = "")
+        #Each file becomes a record of its lines - kept, so later incremental plots can reuse them.
+        #Signatures come from the scan if it just happened - files are only stat'ed here if incremental needs it.
+        previous_records = self._file_records if incremental else {}
+        signatures = {}
+        records = {}
+        to_ingest = []
         for f in self.fileList:
-            fname = os.path.basename(f)
-            colname = self.file_name_to_column_name_regex.search(fname).group(0)
-
-            in_df = pd.read_csv(f)
-            split_df = self.split_dataset_function(in_df)
-
-            for append_name_string, df in split_df.items():
-                line_name = colname+append_name_string
-                try:
-                    
-                    df = self.custom_column_function(df)
-
-                    # xvars = list(df.loc[:,self.x_col])
-                    # yvars = list(df[self.y_col])
-                    xvars = df[self.x_col]
-                    yvars = df[self.y_col]
-                    
-                    ##Plot a plain line
-                    self.fig.add_trace(plotly.graph_objects.Scatter( 
-                        x=xvars, y=yvars,
-                        name=line_name,
-                        showlegend=True,
-                        #legendgroup = colname, 
-                        meta = colname,       
-                        mode='lines+markers',
-                       # marker = dict(symbol = 'cross')
-                    ))
-                    #plot y error bars
-                    if self.y_err_plus != None and self.y_err_minus !=None:
-                        #print("error barrrs")
-                        self.fig.update_traces(selector=dict(name=line_name), 
-                        error_y=dict(
-                            type='data',
-                            visible= not self.shaded_y_error,
-                            symmetric=False,
-                            array = df[self.y_err_plus],
-                            arrayminus= df[self.y_err_minus]
-                        ))
-
-                    ##Plot X error bars
-                    if self.x_err_plus != None and self.x_err_minus !=None:
-                        #print("error barrrs")
-                        self.fig.update_traces(selector=dict(name=line_name), 
-                        error_x=dict(
-                            type='data',
-                            symmetric=False,
-                            array = df[self.x_err_plus],
-                            arrayminus= df[self.x_err_minus]
-                        ))
-                    
-                    if self.custom_markers_dict:
-                        markericon = self.custom_markers_dict.get(append_name_string, None)
-                        if markericon != None:
-                            self.fig.update_traces(selector=dict(name=line_name), 
-                            marker_symbol = markericon,
-                            marker= dict(size = self.marker_size)
-                            
-                        )
-
-
-                    print(colname+append_name_string + ', ', end= "")
-                
-
-                except Exception as e:
-                    print(f"Something went wrong when plotting {fname}")
-                    print(f"=> Exception is {type(e)} , with {e.args}")
-            #Update colours, and add to groups
-            #(last, so the colour iterator doesn't waste itself on failed plots)
-            self.fig.update_traces(selector=dict(meta= colname),
-                line = dict(color=next(line_color)), 
-            )
-
-
-        print("Done.")
-        
-        ##for doing shaded error bars...it needs to plot a contour from the top y to the bottom y
-        # 
-        ##and they need to be roughly the same colour.
-        ##so...can either do in above, or can take all the lines off, recording the colours,
-        #and then reorder
-        #Note the error bar data is now attached to each line object...
-        if self.shaded_y_error and self.y_err_plus != None and self.y_err_minus !=None:
-            for data in self.fig.data: ##for each trace in order.
-                #print(data)
-                if data['error_y']['array'] is None or data['error_y']['arrayminus'] is None:
-                    continue ##skip this one, no error bar data.
-
-                x = list(data['x'])
-                y_upper = list(data['y'] + data['error_y']['array'])
-                y_lower = list(data['y'] - data['error_y']['arrayminus'])
-                
-                color = data['line']['color']
-                color = rgba_set_opacity(color,0.2)
-                
-                self.fig.add_trace(
-                    plotly.graph_objects.Scatter(
-                        x = x+x[::-1], ##goes from start to end to start - closed loop
-                        y = y_upper+y_lower[::-1], #stitches the top bars all around to the bottom ones
-                        fill = 'toself',##good for a closed shape... note it will 'cancel out' if a single trace covers same area twice
-                        fillcolor = color, ##transparentish
-                        mode = 'none', ##forces no lines..
-                        name=data['name']+"_eband", ##
-                        hoverinfo = "skip", ##prevent it being displayed
-                        showlegend = True, ##appear in legend
-                        meta = data['meta'] ##copy metadata for later grouping.
-                    )
-                )
-
-
+            signature = self._scan_signatures.get(f)
+            if signature is None and incremental:
+                signature = fileSignature(f)
+            signatures[f] = signature
+            previous = previous_records.get(f)
+            if previous is not None and signature is not None and previous['signature'] == signature:
+                records[f] = previous
+            else:
+                to_ingest.append(f)
+        if incremental:
+            log.info(f"{len(to_ingest)} new or changed files, {len(records)} unchanged")
+
+        log.info(f"Plotting {len(to_ingest)} files")
+        cache_stats = {'hits': 0, 'misses': 0}
+        trace_seconds = 0
+        with report.stage("ingest"): ##reading, splitting and preprocessing (less the trace building below)
+            frames = self.storeFrames(to_ingest) if self.store != None else None
+            for f, (split_results, file_exception, info) in zip(to_ingest, self.ingestFiles(to_ingest, frames)):
+                if info['cache_hit'] is not None:
+                    cache_stats['hits' if info['cache_hit'] else 'misses'] += 1
+                report.addFile(f, info, file_exception)
+                start = time.perf_counter()
+                records[f] = self.buildFileRecord(f, split_results, file_exception, signatures[f])
+                trace_seconds += time.perf_counter() - start
+        report.stages['ingest'] -= trace_seconds
+        report.add("traces", trace_seconds)
+        self._file_records = records
+
+        #{line_name: dataframe} of the plotted columns, for lines that were thinned out
+        self.full_data = {}
+        for f in self.fileList:
+            self.full_data.update(records[f]['full_data'])
 
-        ##shuffle ebands to the bottom, so drawn first:
-        self.fig.data = self.fig.data[::-1]##reversed order
+        #The lines that share a colour - one file's split lines, or one aggregated group's.
+        #(files that couldn't be read or split have nothing to plot, so don't use up a colour)
+        if self.aggregate_regex != None:
+            with report.stage("aggregate"):
+                coloured = self.aggregateRecords(records)
+        else:
+            coloured = [records[f]['traces'] for f in self.fileList if not records[f]['failed']]
+
+        #svg Scatter, or webgl Scattergl (much quicker to pan/zoom with lots of points)
+        total_points = sum(len(spec['x']) for traces in coloured for spec in traces)
+        scatter = self.scatterType(total_points)
+        report.counts['files'] = len(self.fileList)
+        report.counts['lines'] = sum(len(traces) for traces in coloured)
+        report.counts['points'] = total_points
+
+        #Everything is put together first as Scatter arguments, in the order it'll be drawn,
+        #then added to the figure in one go (update_traces/re-ordering fig.data revalidates every trace)
+        shaded = self.aggregate_regex != None or \
+            (self.shaded_y_error and self.y_err_plus != None and self.y_err_minus !=None)
+        palette = self.palette(len(coloured))
+        lines = []
+        line_records = [] ##each line's traceRecord - for facetKey
+        line_bands = [] ##each line's band, or None
+        band_seconds = 0
+        for colour_index, traces in enumerate(coloured):
+            colour = palette.colour(colour_index)
+            band_colour = palette.colour(colour_index, 0.2)
+            for spec in traces:
+                lines.append(spec.scatterArgs(line = dict(color=colour)))
+                line_records.append(spec)
+                band = None
+                if shaded and 'error_y' in spec:
+                    start = time.perf_counter()
+                    band = errorBand(spec, band_colour)
+                    band_seconds += time.perf_counter() - start
+                line_bands.append(band)
+        bands = [band for band in line_bands if band is not None]
+        report.add("ebands", band_seconds)
+
+        if self.cache_dir != None:
+            self.cache_stats = cache_stats
+            log.info(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+            self.getCache().evict()
+
+        ##Shaded error bands go at the bottom so they're drawn first, then the lines - 
+        ##both newest first, so the legend (reversed, below) comes out oldest first.
+        specs = bands[::-1] + lines[::-1]
 
         #Limit line plotting - so drawn on top last
+        limits = []
         if self.limits_dict:
-            print("Plotting Limits")
+            log.info("Plotting Limits")
             for l_name, t in self.limits_dict.items():
                 
                 xvars,yvars = t
                 #yvars = df[self.y_col]
-                self.fig.add_trace(plotly.graph_objects.Scatter( 
+                limits.append(dict( 
                         x=xvars, y=yvars,
                         name=l_name,
                         showlegend=True,
@@ -299,14 +478,57 @@ class plotHolder():
                        # marker = dict(symbol = 'cross')
                     ))
 
+        self._facet_grid = None
+        if self.facet != None or self.facet_y_cols:
+            self._facet_grid, limits = self.facetTraces(lines, line_bands, limits, line_records)
+        specs += limits
+
         ##
         if self.group_derivative_plots_together:
             rank = 1100
-            for data in self.fig.data[::-1]:
-                data['legendgroup'] = data['meta']
-                data['legendrank'] = rank ##ensures the order comes out OK.
+            for spec in specs[::-1]:
+                spec['legendgroup'] = spec['meta']
+                spec['legendrank'] = rank ##ensures the order comes out OK.
                 rank = rank+1
-                    
+
+        self.plan = specs
+        self._scatter = scatter
+        if not self.lazy:
+            self.materialise()
+
+    @property
+    def fig(self):
+        #The plotly figure - built from self.plan the first time it's used, if .plot was lazy
+        if self._fig is None and self.plan is not None:
+            self.materialise()
+        return self._fig
+
+    @fig.setter
+    def fig(self, fig):
+        self._fig = fig
+
+    def materialise(self):
+        #(Re)build self.fig from self.plan - only the traces that pass self.trace_filter
+        if self.plan is None:
+            raise RuntimeError("Nothing to materialise - call .plot() first")
+        report = self.report or plotReport()
+        specs = self.plan
+        if self.trace_filter is not None:
+            specs = [spec for spec in specs if self.trace_filter(spec)]
+        with report.stage("figure"):
+            if self._facet_grid is not None:
+                from plotly.subplots import make_subplots
+                self._fig = make_subplots(**self._facet_grid)
+            else:
+                self._fig = plotly.graph_objects.Figure()
+            self._fig.update_layout(title=self.title)
+            self._fig.add_traces([self._scatter(**spec) for spec in specs])
+
+        with report.stage("layout"):
+            self._layout()
+        return self._fig
+
+    def _layout(self):
 
         #fig.showlegend = True
         if self.x_title == None:
@@ -317,6 +539,9 @@ class plotHolder():
 
         self.fig.update_xaxes(title_text=self.x_title)
         self.fig.update_yaxes(title_text=self.y_title)
+        if self.facet_y_cols and self._facet_grid is not None:
+            for row, y_col in enumerate(self.facet_y_cols):
+                self.fig.update_yaxes(title_text=y_col, row=row+1, col=1)
 
         if self.logx:
             self.fig.update_xaxes(type="log")
@@ -327,8 +552,8 @@ class plotHolder():
             hoverlabel_namelength=-1, #-1 allows full name
         )
 
-        if self.toggle_derivative_plots_together:
-            self.fig.update_layout(legend_groupclick="togglegroup")
+        if self.toggle_derivative_plots_together or self.facet_y_cols:
+            self.fig.update_layout(legend_groupclick="togglegroup") ##(a line's rows are a group)
         else:
             self.fig.update_layout(legend_groupclick="toggleitem")
 
@@ -342,58 +567,1531 @@ class plotHolder():
 
 
 
-    def show(self):
-        print("Opeing plot in browser")
-        self.fig.show()
+    def update(self):
+        #Replot, only reading the files that are new or changed (see .plot)
+        self.plot(incremental=True)
+
+    def buildFileRecord(self, f, split_results, file_exception, signature=None):
+        #Turn the ingested pieces of one file into a record of its (uncoloured) traces.
+        #{'signature': (mtime, size) when found (None if not stat'ed), 'failed': couldn't read/split it, 'traces': [traceRecord...]}
+        #The traces have their own copies of the numbers, so the dataframes can go once this is done.
+        fname = os.path.basename(f)
+        colname = self.file_name_to_column_name_regex.search(fname).group(0)
+        record = {'signature': signature, 'failed': file_exception is not None, 'traces': [], 'full_data': {}}
+
+        if file_exception is not None:
+            log.warning(f"Something went wrong when plotting {fname}")
+            log.warning(f"=> Exception is {type(file_exception)} , with {file_exception.args}")
+            return record
+
+        for append_name_string, df, e in split_results:
+            line_name = colname+append_name_string
+            try:
+                if e is not None:
+                    raise e ##from the custom column function
+
+                if self.max_points_per_trace and len(df) > self.max_points_per_trace:
+                    record['full_data'][line_name] = df[self.plotColumns()]
+                    df = self.downsample(df)
+
+                if self.facet_y_cols:
+                    #a line per y column - yaxis says which row it's in, until facetTraces places it
+                    for row, y_col in enumerate(self.facet_y_cols):
+                        trace = self.buildTrace(df, line_name, colname, append_name_string, y_col)
+                        trace['yaxis'] = axisName('y', row+1)
+                        record['traces'].append(trace)
+                else:
+                    record['traces'].append(self.buildTrace(df, line_name, colname, append_name_string))
+                log.debug(f"Plotted {line_name}")
+
+            except Exception as e:
+                log.warning(f"Something went wrong when plotting {fname}")
+                log.warning(f"=> Exception is {type(e)} , with {e.args}")
+        return record
+
+    def palette(self, n):
+        #The colourPalette for n colours - spread along colour_scale if set, otherwise colourSequence
+        if self.colour_scale != None:
+            return colourPalette.fromScale(self.colour_scale, n)
+        if isinstance(self.colourSequence, colourPalette):
+            return self.colourSequence
+        return colourPalette(self.colourSequence)
+
+    def facetKey(self, spec):
+        #Which panel a line goes in, as per self.facet
+        if self.facet == "split":
+            return spec['split']
+        if hasattr(self.facet, 'search'):
+            match = self.facet.search(spec['name'])
+            if match is None:
+                return spec['name']
+            return match.group(1) if match.re.groups else match.group(0)
+        return self.facet(spec)
+
+    def facetTraces(self, lines, line_bands, limits, records):
+        #Put each line (and its band) in its panel, by setting their xaxis/yaxis.
+        #records are the lines' traceRecords, which facetKey goes by.
+        #Panels go in order of their first line. Limits go in every panel.
+        #Returns (make_subplots arguments, the limits)
+        n_rows = len(self.facet_y_cols) if self.facet_y_cols else 1
+        keys = {}
+        places = []
+        for line, record in zip(lines, records):
+            key = self.facetKey(record) if self.facet != None else None
+            row = int(line.get('yaxis', 'y')[1:] or 1) - 1 ##the y column's row, if stacking them
+            places.append((keys.setdefault(key, len(keys)), row))
+
+        n_keys = max(len(keys), 1)
+        if self.facet_y_cols:
+            n_cols = n_keys
+        else:
+            n_cols = self.facet_columns or int(np.ceil(np.sqrt(n_keys)))
+            n_rows = int(np.ceil(n_keys / n_cols))
+
+        def axes(key_index, row):
+            #(row, col) in the grid, and the axis names make_subplots gives that panel
+            if self.facet_y_cols:
+                r, c = row, key_index
+            else:
+                r, c = divmod(key_index, n_cols)
+            index = r*n_cols + c + 1
+            return axisName('x', index), axisName('y', index)
+
+        for line, band, (key_index, row) in zip(lines, line_bands, places):
+            xaxis, yaxis = axes(key_index, row)
+            for spec in (line, band):
+                if spec is not None:
+                    spec['xaxis'] = xaxis
+                    spec['yaxis'] = yaxis
+                    if self.facet_y_cols and row > 0:
+                        spec['showlegend'] = False ##once is enough
+                    if self.facet_y_cols and not self.group_derivative_plots_together:
+                        spec['legendgroup'] = line['name'] ##so it toggles in every row
+
+        if self.facet_y_cols: ##limits are in y_col's units, so only its row
+            panels = [(k, row) for row, y_col in enumerate(self.facet_y_cols) if y_col == self.y_col for k in range(n_keys)]
+        else:
+            panels = [(k, 0) for k in range(n_keys)]
+        panel_limits = []
+        for i, (key_index, row) in enumerate(panels):
+            xaxis, yaxis = axes(key_index, row)
+            for limit in limits:
+                panel_limits.append(dict(limit, xaxis=xaxis, yaxis=yaxis, legendgroup=limit['name'], showlegend=i == 0))
+
+        titles = [str(k) for k in keys if k is not None]
+        grid = dict(rows=n_rows, cols=n_cols, shared_xaxes='all', shared_yaxes='rows' if self.facet_y_cols else 'all',
+            vertical_spacing=0.04, horizontal_spacing=0.02)
+        if titles:
+            #make_subplots titles go across then down - blank for the rows below the first when stacking
+            grid['subplot_titles'] = titles + [""]*(n_rows*n_cols - len(titles)) if self.facet_y_cols \
+                else titles
+        return grid, panel_limits
+
+    def aggregateKey(self, f):
+        #Which group a file goes in, by self.aggregate_regex (files it doesn't match are on their own)
+        fname = os.path.basename(f)
+        match = self.aggregate_regex.search(fname)
+        if match is None:
+            return self.file_name_to_column_name_regex.search(fname).group(0)
+        return match.group(1) if match.re.groups else match.group(0)
+
+    def aggregateRecords(self, records):
+        #Boil the files' lines down to one line (with its band as error_y) per group and split.
+        #Returns a list (per group, in order of their first file) of lists of Scatter arguments.
+        groups = {}
+        for f in self.fileList:
+            if records[f]['failed']:
+                continue
+            key = self.aggregateKey(f)
+            for spec in records[f]['traces']:
+                append_name_string = spec.get('split', "")
+                groups.setdefault(key, {}).setdefault((append_name_string, spec.get('yaxis')), []).append(spec)
+
+        coloured = []
+        for key, splits in groups.items():
+            traces = []
+            for (append_name_string, yaxis), specs in splits.items():
+                x, y, lower, upper = aggregateLines([(spec['x'], spec['y']) for spec in specs],
+                    self.aggregate_points, self.aggregate_stat, self.aggregate_band, log=self.logx)
+                trace = traceRecord(
+                    x=x, y=y,
+                    name=f"{key}{append_name_string} ({len(specs)})", ##how many lines went into it
+                    meta = key,
+                    split = append_name_string,
+                    mode='lines',
+                    error_y = dict(type='data', visible=False, symmetric=False,
+                        array = upper - y, arrayminus = y - lower) ##for errorBand
+                )
+                if yaxis is not None:
+                    trace['yaxis'] = yaxis
+                traces.append(trace)
+            coloured.append(traces)
+        log.info(f"Aggregated {len(self.fileList)} files into {len(coloured)} groups")
+        return coloured
+
+    def scatterType(self, total_points):
+        #Scatter or Scattergl, as per self.render_backend
+        if self.render_backend == "webgl" or \
+            (self.render_backend == "auto" and total_points > self.webgl_point_threshold):
+            return plotly.graph_objects.Scattergl
+        elif self.render_backend in ("svg", "auto"):
+            return plotly.graph_objects.Scatter
+        raise ValueError(f"Unknown render_backend {self.render_backend}, should be 'svg', 'webgl' or 'auto'")
+
+    def plotColumns(self):
+        #The dataframe columns that actually get plotted - x, y and any error columns
+        cols = [self.x_col] + self.yColumns()
+        if self.y_err_plus != None and self.y_err_minus !=None:
+            cols += [self.y_err_plus, self.y_err_minus]
+        if self.x_err_plus != None and self.x_err_minus !=None:
+            cols += [self.x_err_plus, self.x_err_minus]
+        return list(dict.fromkeys(cols)) ##no repeats, keeps order
+
+    def downsample(self, df):
+        #Thin df down to about self.max_points_per_trace rows, keeping the shape of x vs y.
+        #Whole rows are kept, so the error columns stay lined up with their points.
+        return downsampleFrame(df, self.x_col, self.yColumns()[0], self.max_points_per_trace, self.downsample_method)
+
+    def yColumns(self):
+        #The y columns plotted - facet_y_cols if stacking them, otherwise just y_col
+        return list(self.facet_y_cols) if self.facet_y_cols else [self.y_col]
+
+    def buildTrace(self, df, line_name, colname, append_name_string, y_col=None):
+        #Put together the complete Scatter arguments for one line (error bars, markers and all)
+        #y_col defaults to self.y_col
+        # xvars = list(df.loc[:,self.x_col])
+        # yvars = list(df[self.y_col])
+        xvars = df[self.x_col]
+        yvars = df[y_col or self.y_col]
+
+        ##Plot a plain line
+        trace = traceRecord(
+            x=xvars, y=yvars,
+            name=line_name,
+            #legendgroup = colname, 
+            meta = colname,       
+            split = append_name_string,
+            mode='lines+markers',
+           # marker = dict(symbol = 'cross')
+        )
+        #plot y error bars
+        if self.y_err_plus != None and self.y_err_minus !=None:
+            trace['error_y'] = dict(
+                type='data',
+                visible= not self.shaded_y_error,
+                symmetric=False,
+                array = traceArray(df[self.y_err_plus]),
+                arrayminus= traceArray(df[self.y_err_minus])
+            )
 
+        ##Plot X error bars
+        if self.x_err_plus != None and self.x_err_minus !=None:
+            trace['error_x'] = dict(
+                type='data',
+                symmetric=False,
+                array = traceArray(df[self.x_err_plus]),
+                arrayminus= traceArray(df[self.x_err_minus])
+            )
 
+        if self.custom_markers_dict:
+            markericon = self.custom_markers_dict.get(append_name_string, None)
+            if markericon != None:
+                trace['marker'] = dict(symbol = markericon, size = self.marker_size)
+
+        return trace ##everything but the colour - see .plot
+
+    def ingestFiles(self, files, frames=None):
+        #Read, split and preprocess each file - in a pool of workers if self.workers is set.
+        #Yields (split_results, file_exception, info) per file, in the same order as files.
+        #(see ingestFile for what those are)
+        #frames - already read files to use, as self.frame_source (which it defaults to)
+        if frames is None:
+            frames = self.frame_source
+        ingest = functools.partial(ingestFile,
+            split_dataset_function = self.split_dataset_function,
+            custom_column_function = self.custom_column_function,
+            read_kwargs = self.readerOptions(),
+            cache = self.getCache(),
+            frames = frames,
+            stream = self.chunkThinner())
+
+        if not self.workers or self.workers <= 1 or len(files) <= 1:
+            for f in files:
+                yield ingest(f)
+            return
+
+        executor_type = concurrent.futures.ProcessPoolExecutor
+        if frames:
+            executor_type = concurrent.futures.ThreadPoolExecutor ##already in memory, no sense sending it elsewhere
+        elif self.worker_type == "thread" or not _picklable(ingest):
+            if self.worker_type != "thread":
+                log.warning("Split/custom functions can't be sent to worker processes (lambdas?) - using threads instead")
+            executor_type = concurrent.futures.ThreadPoolExecutor
+
+        n = len(files)
+        workers = min(self.workers, n)
+        with executor_type(max_workers=workers) as executor:
+            if executor_type is concurrent.futures.ProcessPoolExecutor:
+                #batch the files up a bit, to save on the round trips
+                yield from executor.map(ingest, files, chunksize = max(1, n//(workers*4)))
+            else:
+                yield from executor.map(ingest, files)
+
+    def chunkThinner(self):
+        #For reading in chunks - None unless self.chunksize is set
+        if not self.chunksize:
+            return None
+        return chunkThinner(self.chunksize, self.x_col, self.yColumns()[0],
+            self.max_points_per_trace or 10000, self.downsample_method)
+
+    def readerOptions(self):
+        #The keyword arguments for pd.read_csv, from the reader settings and read_csv_kwargs
+        options = {}
+
+        engine = self.csv_engine
+        if engine == "auto":
+            engine = "pyarrow" if _pyarrowAvailable() else None
+        if engine != None:
+            options['engine'] = engine
+
+        if self.usecols == "auto":
+            cols = self.plotColumns() + list(self.extra_columns)
+            for fn in (self.split_dataset_function, self.custom_column_function):
+                cols += list(getattr(fn, 'columns', ()))
+            options['usecols'] = columnSelector(cols)
+        elif self.usecols != None:
+            options['usecols'] = columnSelector(self.usecols)
+
+        if self.column_dtype != None:
+            options['dtype'] = {c: self.column_dtype for c in self.plotColumns()}
+
+        if self.memory_map and engine != "pyarrow":
+            options['memory_map'] = True
+
+        options.update(self.read_csv_kwargs)
+        return options
+
+    def storeOptions(self):
+        #The reader options the store is made with - all the columns, they're picked out when reading it
+        return {k: v for k, v in self.readerOptions().items() if k != 'usecols'}
+
+    def compact(self, store=None, files=None):
+        #Put every file from getFileList (or files) into one columnar file - store, or self.store.
+        #If it's already there, only new or changed files are read. Returns the runStore.
+        store = runStore(store or self.store, root=self.cwd)
+        if files == None:
+            files = self.getFileList()
+        store.update(files, self.storeOptions(), workers=self.workers)
+        return store
+
+    def findFiles(self):
+        #The files to plot - from self.store if it isn't being refreshed (the csvs may be gone), else getFileList
+        if self.store != None and not self.store_refresh:
+            return self.storeFileList()
+        return self.getFileList()
+
+    def storeFileList(self):
+        #As getFileList, but from the list of files in self.store rather than the directory
+        log.info(f"Generating file list from {self.store}")
+        store = runStore(self.store, root=self.cwd)
+        found = []
+        for rel, (mtime_ns, size, columns) in store.files().items():
+            f = os.path.join(self.cwd, rel)
+            parts = rel.split(os.sep)[:-1]
+            if parts and not self.recursive:
+                continue
+            if self.max_depth != None and len(parts) > self.max_depth:
+                continue
+            if self.subdir_glob != None and not all(fnmatch.fnmatch(p, self.subdir_glob) for p in parts):
+                continue
+            if self._filterStage(f) == 3:
+                found.append((f, mtime_ns))
+        log.info(f"There are {len(found)} matching files in the store")
+
+        if self.newest_n != None:
+            found = heapq.nlargest(self.newest_n, found, key=lambda pair: pair[1])[::-1]
+        else:
+            found.sort(key=lambda pair: pair[1]) ##oldest first
+        return [f for f, mtime_ns in found]
 
-    def getFileList(self):
-        #Using the directories and regexes, return a list of data files to plot.
-        print(f"Generating file list for directory {self.cwd}")
- 
-        files = [os.path.join(self.cwd,f) for f in os.listdir(self.cwd)]
- 
-        files = [f for f in files if os.path.isfile(f)]
-        print(f"There are {len(files)} files in the directory")
+    def storeFrames(self, files):
+        #{frameKey: dataframe} for the files in self.store - for ingestFile's frames
+        read_kwargs = self.readerOptions()
+        frames = runStore(self.store, root=self.cwd).frames(files, read_kwargs.get('usecols'), self.storeOptions())
+        return {frameKey(f, read_kwargs): df for f, df in frames.items()}
 
-        files.sort(key=lambda x: os.path.getmtime(x)) ##Sort by time (oldest first)
-        files = [f for f in files if self.file_name_match_regex.match(f)]
-        print(f"There are {len(files)} files post file match filtering")
+    def getCache(self):
+        #The frameCache for self.cache_dir, or None if not caching.
+        if self.cache_dir == None:
+            return None
+        return frameCache(self.cache_dir, max_bytes=self.cache_max_bytes, fmt=self.cache_format)
 
 
-        if self.name_blacklist_regex != None:
-            blacklist = []
-            for f in files:
-                fname= os.path.basename(f)
-                if self.name_blacklist_regex.search(fname):
-                    #print(f"Delisting {fname}")
-                    blacklist.append(f)
+    def show(self):
+        log.info("Opening plot in browser")
+        self.fig.show()
 
-            for b in blacklist:
-                files.remove(b)
+    def draw(self, out_file=None):
+        #Write the figure out as a html file - returns the path written.
+        #out_file defaults to self.out_file, or the title. (see the draw settings in __init__)
+        if out_file == None:
+            out_file = self.out_file or (re.sub(r'[^\w\-. ]', '_', self.title or "plot") + ".html")
+        if self.gzip_html and not out_file.endswith(".gz"):
+            out_file += ".gz"
+
+        fig_dict = self.fig.to_dict()
+        if self.compact_arrays:
+            fig_dict['data'] = _compactArrays(fig_dict['data'])
+
+        include_plotlyjs = self.include_plotlyjs
+        if include_plotlyjs == "directory":
+            #one shared copy next to all the html files, rather than 3MB+ inside every one.
+            #Named by plotly version, so html written by a newer plotly doesn't load an old copy.
+            include_plotlyjs = f"plotly-{plotly.__version__}.min.js"
+            bundle = os.path.join(os.path.dirname(os.path.abspath(out_file)), include_plotlyjs)
+            if not os.path.exists(bundle):
+                tmp = f"{bundle}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as js:
+                    js.write(plotly.offline.get_plotlyjs())
+                os.replace(tmp, bundle)
+
+        html = plotly.io.to_html(fig_dict, include_plotlyjs=include_plotlyjs, full_html=True, validate=False)
+
+        #write to a temporary file then swap it in, so a browser/watcher never sees half a file.
+        tmp = f"{out_file}.{os.getpid()}.tmp" ##session workers may be drawing the same file
+        if self.gzip_html:
+            with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as out:
+                out.write(html)
+        else:
+            with open(tmp, 'w', encoding='utf-8') as out:
+                out.write(html)
+        os.replace(tmp, out_file)
+        log.info(f"Wrote {out_file}")
+        return out_file
+
+    def exportImage(self, out_file, **kwargs):
+        #Static image (png, svg, pdf... by extension) via kaleido. kwargs go to plotly's write_image
+        self.fig.write_image(out_file, **kwargs)
+        return out_file
+
+
+
+    def watch(self, out_file, max_redraws=None):
+        #Keep out_file (html) up to date as files appear/change in self.cwd - until ctrl-c.
+        #Uses the same regexes as getFileList, and only rereads new/changed files (see .update).
+        #Uses watchdog (inotify etc.) if it is installed, otherwise polls cheaply.
+        self.update()
+        self.draw(out_file)
+        redraws = 0
+
+        watcher = _watchdogWatcher(self) if _watchdogWatcher.available() else _pollingWatcher(self)
+        log.info(f"Watching {self.cwd} for changes ({watcher.kind}), ctrl-c to stop")
+        last_change = None
+        try:
+            while max_redraws is None or redraws < max_redraws:
+                time.sleep(self.watch_interval)
+                if watcher.changed():
+                    last_change = time.monotonic()
+                if last_change is not None and time.monotonic() - last_change >= self.watch_debounce:
+                    last_change = None
+                    self.update()
+                    self.draw(out_file)
+                    redraws += 1
+        except KeyboardInterrupt:
+            log.info("Stopped watching")
+        finally:
+            watcher.stop()
+
+    def fileMatches(self, f):
+        #True if the file f (a path in self.cwd) would make it through the getFileList filtering
+        return self._filterStage(f) == 3
+
+    def _filterStage(self, f):
+        #How many of the filters f gets through - 0: fails the match, 1: blacklisted,
+        # 2: not in the whitelist, 3: all the way through.
+        if not self.file_name_match_regex.match(f):
+            return 0
+        fname = os.path.basename(f)
+        if self.name_blacklist_regex != None and self.name_blacklist_regex.search(fname):
+            return 1
+        if self.name_excl_whitelist_regex != None and not self.name_excl_whitelist_regex.search(fname):
+            return 2
+        return 3
+
+    def scanFiles(self, counts=None, directories=None):
+        #One pass over self.cwd (and subdirectories if self.recursive) with os.scandir.
+        #Returns a list of (path, stat result) for the files that pass the filters.
+        #Only the files that pass are stat'ed. counts (a list of 4) gets how many got to each filter stage.
+        #directories (a dict) gets {directory: signature} of each directory looked in.
+        #Symlinked directories are followed, but each directory is only looked in once (no loops).
+        #Entries that can't be looked at (broken links, permissions...) are logged and skipped.
+        found = []
+        seen = set() ##(st_dev, st_ino) of the directories looked in
+        stack = [(self.cwd, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                st = os.stat(directory)
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                if directories is not None:
+                    directories[directory] = (st.st_mtime_ns, st.st_size)
+                it = os.scandir(directory)
+            except OSError as e:
+                log.warning(f"Couldn't look in {directory} => {e}")
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if self.recursive and (self.max_depth == None or depth < self.max_depth) \
+                                and (self.subdir_glob == None or fnmatch.fnmatch(entry.name, self.subdir_glob)):
+                                stack.append((os.path.join(directory, entry.name), depth+1))
+                            continue
+                        if not entry.is_file():
+                            continue
+
+                        f = os.path.join(directory, entry.name)
+                        stage = self._filterStage(f)
+                        if counts is not None:
+                            for i in range(stage+1):
+                                counts[i] += 1
+                        if stage == 3:
+                            found.append((f, entry.stat()))
+                    except OSError as e:
+                        log.warning(f"Couldn't look at {os.path.join(directory, entry.name)} => {e}")
+        return found
+
+    def collate(self, out_file=None, **kwargs):
+        #Collate this holder's files into one wide csv/dataframe (see collateFiles).
+        #Writes out_file if given. kwargs go to collateFiles.
+        files = self.fileList if self.fileList != None else self.getFileList()
+        kwargs.setdefault('column_name_regex', self.file_name_to_column_name_regex)
+        collated = collateFiles(files, **kwargs)
+        if out_file != None:
+            writeCollated(collated, out_file)
+        return collated
 
-            print(f"There are {len(files)} files post blacklist filtering")
+    def getFileList(self):
+        #Using the directories and regexes, return a list of data files to plot. (oldest first)
+        log.info(f"Generating file list for directory {self.cwd}")
 
+        counts = [0, 0, 0, 0]
+        found = self.scanFiles(counts)
+        log.info(f"There are {counts[0]} files in the directory")
+        log.info(f"There are {counts[1]} files post file match filtering")
+        if self.name_blacklist_regex != None:
+            log.info(f"There are {counts[2]} files post blacklist filtering")
         if self.name_excl_whitelist_regex != None:
-            whitelist = []
-            for f in files:
-                fname= os.path.basename(f)
-                if self.name_excl_whitelist_regex.search(fname):
-                    #print(f"Delisting {fname}")
-                    whitelist.append(f)
-
-            files = whitelist
+            log.info(f"There are {counts[3]} files post whitelist filtering")
 
-            print(f"There are {len(files)} files post whitelist filtering")
-        
+        mtime = lambda pair: pair[1].st_mtime_ns
+        if self.newest_n != None:
+            #no need to sort the lot
+            found = heapq.nlargest(self.newest_n, found, key=mtime)[::-1]
+            log.info(f"Keeping the newest {len(found)} files")
+        else:
+            found.sort(key=mtime) ##Sort by time (oldest first)
+        self._scan_signatures = {f: (st.st_mtime_ns, st.st_size) for f, st in found}
 
-        return files
+        return [f for f, st in found]
     
 
 
 
 
+class plotSession():
+    #A batch of plotHolders over the same data - e.g. lots of figures from one directory.
+    #Each file is only read once (for all the holders that use it), then each holder is plotted
+    #and drawn, optionally in parallel worker processes.
+    #
+    #   session = plotSession([holder1, holder2, ...])
+    #   session.workers = 4
+    #   session.run() ##returns the html files written
+    #
+    #With workers, the holders are plotted and drawn in the worker processes, so afterwards the
+    #holders here don't have a fig, plan or report - just session.reports and the html files.
+    #The workers get the read files by forking (where the platform has fork), not by pickling them;
+    #anywhere else each worker reads its holder's files itself (through the holder's cache, if set).
+
+    def __init__(self, holders):
+        self.holders = list(holders)
+        #Worker processes for plotting/drawing the holders (None = one after another, here)
+        self.workers = None
+        #Threads for reading the files
+        self.read_workers = 4
+        #{frameKey: dataframe} of everything read - shared between the holders
+        self.frames = {}
+        #After .run - each holder's plotReport.asDict(), with the html writing time as the 'draw' stage
+        self.reports = []
+
+    def sharesFrames(self, holder):
+        #Whether holder plots from the session's frames - not if it reads its files in chunks
+        #(chunksize - reading them whole here would undo the memory bound), or from its store
+        return not holder.chunksize and holder.store == None
+
+    def load(self):
+        #Work out every holder's file list, and read the union of them once (for the holders that share).
+        wanted = {}
+        for holder in self.holders:
+            if holder.fileList == None:
+                holder.fileList = holder.findFiles()
+                holder._auto_file_list = True
+            if not self.sharesFrames(holder):
+                continue
+            read_kwargs = holder.readerOptions()
+            for f in holder.fileList:
+                key = frameKey(f, read_kwargs)
+                if key not in self.frames and key not in wanted:
+                    wanted[key] = (f, read_kwargs, holder.getCache())
+
+        log.info(f"Reading {len(wanted)} files for {len(self.holders)} plots")
+        def read(args):
+            f, read_kwargs, cache = args
+            try:
+                return readDataFile(f, read_kwargs, cache)[0]
+            except Exception:
+                return None ##left for the holder to read again and report
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.read_workers or 1) as executor:
+            for key, df in zip(wanted, executor.map(read, wanted.values())):
+                if df is not None:
+                    self.frames[key] = df
+
+        for holder in self.holders:
+            holder.frame_source = self.frames if self.sharesFrames(holder) else {}
+
+    def run(self, draw=True):
+        #Plot (and draw, unless draw=False) every holder. Returns the html files written.
+        import multiprocessing
+        parallel = draw and self.workers and self.workers > 1 and len(self.holders) > 1
+        if parallel and not self._picklable():
+            log.warning("Plots can't be sent to worker processes (lambdas?) - plotting here instead")
+            parallel = False
+        fork = "fork" in multiprocessing.get_all_start_methods()
+        if not parallel or fork:
+            self.load() ##without fork the workers couldn't have the frames anyway - each reads its own files
+        if not parallel:
+            results = [_plotAndDraw(holder, draw) for holder in self.holders]
+            self.reports = [report for out_file, report in results]
+            return [out_file for out_file, report in results if out_file is not None]
+
+        #the holders are sent without the frames - forked workers pick them up from _session_frames
+        #(the figures are made and drawn in the workers - only the file names and reports come back)
+        global _session_frames
+        for holder in self.holders:
+            holder.frame_source = None if self.sharesFrames(holder) else {}
+        try:
+            _session_frames = self.frames if fork else {}
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.workers, len(self.holders)),
+                    mp_context=multiprocessing.get_context("fork") if fork else None) as executor:
+                results = list(executor.map(_plotAndDraw, self.holders))
+        finally:
+            _session_frames = {}
+            for holder in self.holders:
+                holder.frame_source = self.frames if self.sharesFrames(holder) else {}
+        self.reports = [report for out_file, report in results]
+        return [out_file for out_file, report in results]
+
+    def _picklable(self):
+        #Whether the holders can be sent to worker processes - without their frames, as run sends them
+        sources = [holder.frame_source for holder in self.holders]
+        for holder in self.holders:
+            holder.frame_source = None
+        try:
+            return _picklable(*self.holders)
+        finally:
+            for holder, source in zip(self.holders, sources):
+                holder.frame_source = source
+
+
+_session_frames = {} ##plotSession.frames while it runs, for forked worker processes to inherit
+
+
+def _plotAndDraw(holder, draw=True):
+    #for plotSession (and its worker processes) - returns (html file or None, report dict)
+    if holder.frame_source is None:
+        holder.frame_source = _session_frames ##in a worker
+    holder.plot()
+    out_file = None
+    report = holder.report.asDict()
+    if draw:
+        start = time.perf_counter()
+        out_file = holder.draw()
+        report['stages']['draw'] = time.perf_counter() - start
+    return out_file, report
+
+def readDataFile(f, read_kwargs=None, cache=None):
+    #pd.read_csv, via the frameCache if there is one. Returns (dataframe, cache hit or None)
+    if cache is not None:
+        return cache.read(f, read_kwargs)
+    return readCsv(f, read_kwargs), None
+
+def readCsv(f, read_kwargs=None):
+    #pd.read_csv, sorting out the bits of the reader options the engines differ on
+    read_kwargs = dict(read_kwargs or {})
+    usecols = read_kwargs.get('usecols')
+    if isinstance(usecols, columnSelector) and read_kwargs.get('engine') == "pyarrow":
+        #pyarrow wants a plain list of columns that are all there - so check the header first
+        header = pd.read_csv(f, nrows=0, **{k: v for k, v in read_kwargs.items() if k not in ('usecols', 'engine', 'dtype')})
+        read_kwargs['usecols'] = [c for c in header.columns if usecols(c)]
+    return pd.read_csv(f, **read_kwargs)
+
+class columnSelector():
+    #usecols for pd.read_csv - picks out the wanted columns, and doesn't mind if some are missing.
+    #(a class rather than a lambda, so it can go to worker processes and into cache keys)
+    def __init__(self, columns):
+        self.columns = frozenset(columns)
+
+    def __call__(self, column):
+        return column in self.columns
+
+    def __repr__(self):
+        return f"columnSelector({sorted(self.columns)})"
+
+    def __eq__(self, other):
+        return isinstance(other, columnSelector) and self.columns == other.columns
+
+    def __hash__(self):
+        return hash(self.columns)
+
+def _pyarrowAvailable():
+    try:
+        import pyarrow
+        return True
+    except ImportError:
+        return False
+
+def frameKey(f, read_kwargs=None):
+    #What a read file is known by in plotHolder.frame_source
+    return (os.path.abspath(f), repr(sorted((read_kwargs or {}).items())))
+
+def ingestFile(f, split_dataset_function, custom_column_function, read_kwargs=None, cache=None, frames=None, stream=None):
+    #Read one file, split it, and preprocess each split.
+    #Module level so it can be run in worker processes.
+    #frames - already read files, see plotHolder.frame_source
+    #stream - a chunkThinner to read the file in chunks with (see plotHolder.chunksize)
+    #Returns (split_results, file_exception, info):
+    # split_results is a list of (append_name_string, dataframe, exception)
+    # - one of dataframe or exception is None, as the custom function may fail per split.
+    # file_exception is set (and split_results empty) if the file couldn't be read or split.
+    # info is a dict of bits about how it went (e.g. 'cache_hit')
+    # (cache_hit, read_seconds, preprocess_seconds, rows)
+    info = {'cache_hit': None}
+    start = time.perf_counter()
+    if stream is not None:
+        try:
+            split_results = ingestFileChunked(f, split_dataset_function, custom_column_function, read_kwargs, stream, info)
+        except Exception as e:
+            return [], e, info
+        info['read_seconds'] = time.perf_counter() - start ##reading/splitting/preprocessing all mixed up
+        return split_results, None, info
+
+    try:
+        in_df = frames.get(frameKey(f, read_kwargs)) if frames else None
+        owned = in_df is None ##i.e. not shared with anything else
+        if owned:
+            in_df, info['cache_hit'] = readDataFile(f, read_kwargs, cache)
+        info['rows'] = len(in_df)
+        info['read_seconds'] = time.perf_counter() - start
+        start = time.perf_counter()
+        split_df = split_dataset_function(in_df)
+    except Exception as e:
+        return [], e, info
+
+    split_results = []
+    for append_name_string, df in split_df.items():
+        try:
+            split_results.append((append_name_string, preprocess(custom_column_function, df, owned), None))
+        except Exception as e:
+            split_results.append((append_name_string, None, e))
+    info['preprocess_seconds'] = time.perf_counter() - start
+    return split_results, None, info
+
+def ingestFileChunked(f, split_dataset_function, custom_column_function, read_kwargs, stream, info=None):
+    #As ingestFile, but reading the file a chunk at a time, splitting and preprocessing each chunk
+    #and thinning each split line as it goes - so memory stays bounded however big the file is.
+    #Raises if the file can't be read, otherwise returns split_results as ingestFile.
+    read_kwargs = dict(read_kwargs or {})
+    if read_kwargs.get('engine') == "pyarrow":
+        del read_kwargs['engine'] ##can't do chunks
+
+    thinners = {}
+    failed = {}
+    rows = 0
+    with pd.read_csv(f, chunksize=stream.chunksize, **read_kwargs) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+            for append_name_string, df in split_dataset_function(chunk).items():
+                if append_name_string in failed:
+                    continue
+                try:
+                    df = preprocess(custom_column_function, df, owned=True) ##chunks are never shared
+                    thinners.setdefault(append_name_string, stream.copy()).add(df)
+                except Exception as e:
+                    failed[append_name_string] = e
+
+    if info is not None:
+        info['rows'] = rows
+    split_results = [(name, thinner.frame(), None) for name, thinner in thinners.items() if name not in failed]
+    split_results += [(name, None, e) for name, e in failed.items()]
+    return split_results
+
+def preprocess(custom_column_function, df, owned):
+    #Run the custom column function - skipping the defensive copy in noop
+    #when nothing else holds on to df (e.g. freshly read files or chunks)
+    if custom_column_function is noop and owned:
+        return df
+    return custom_column_function(df)
+
+class chunkThinner():
+    #Collects the chunks of one line, thinning them down to about max_points as they come in.
+    #Keeps at most ~2x max_points rows (plus the latest chunk) at a time.
+    def __init__(self, chunksize, x_col, y_col, max_points, method):
+        self.chunksize = chunksize
+        self.x_col = x_col
+        self.y_col = y_col
+        self.max_points = max_points
+        self.method = method
+        self.pieces = []
+        self.rows = 0
+
+    def copy(self):
+        return chunkThinner(self.chunksize, self.x_col, self.y_col, self.max_points, self.method)
+
+    def add(self, df):
+        self.pieces.append(df)
+        self.rows += len(df)
+        if self.rows > 2*self.max_points:
+            self._thin()
+
+    def _thin(self):
+        df = pd.concat(self.pieces) if len(self.pieces) > 1 else self.pieces[0]
+        df = downsampleFrame(df, self.x_col, self.y_col, self.max_points, self.method)
+        self.pieces = [df]
+        self.rows = len(df)
+
+    def frame(self):
+        if not self.pieces:
+            return pd.DataFrame()
+        if len(self.pieces) > 1 or self.rows > self.max_points:
+            self._thin()
+        return self.pieces[0]
+
+def downsampleFrame(df, x_col, y_col, max_points, method):
+    #Rows of df thinned to about max_points - see lttbIndices/minmaxIndices
+    if method == "lttb":
+        idx = lttbIndices(df[x_col].to_numpy(), df[y_col].to_numpy(), max_points)
+    elif method == "minmax":
+        idx = minmaxIndices(df[y_col].to_numpy(), max_points)
+    else:
+        raise ValueError(f"Unknown downsample_method {method}, should be 'lttb' or 'minmax'")
+    return df.iloc[idx]
+
+class _pollingWatcher():
+    #Spots changes without sweeping the whole directory each time:
+    # - a directory's own modified time changes when files are added/removed/renamed
+    #   (each directory scanned is checked - the subdirectories too, if recursive)
+    # - the newest few matching files are stat'ed each time (rigs tend to append to those)
+    # - everything is re-stat'ed every holder.watch_full_rescan_every polls, for the odd edit to an old file
+    kind = "polling"
+
+    def __init__(self, holder):
+        self.holder = holder
+        self.polls = 0
+        self._scan()
+
+    def _scan(self):
+        #Rescan - sets self.known ({path: signature} of the matching files), self.directories and self.hot
+        self.directories = {}
+        self.known = {f: (st.st_mtime_ns, st.st_size) for f, st in self.holder.scanFiles(directories=self.directories)}
+        self.hot = heapq.nlargest(self.holder.watch_hot_files, self.known, key=self.known.get)
+
+    def changed(self):
+        self.polls += 1
+        if self.polls % self.holder.watch_full_rescan_every == 0 or \
+            any(fileSignature(d) != signature for d, signature in self.directories.items()):
+            known = self.known
+            self._scan()
+            return known != self.known
+
+        changed = False
+        for f in self.hot:
+            signature = fileSignature(f)
+            if signature != self.known[f]:
+                self.known[f] = signature
+                changed = True
+        return changed
+
+    def stop(self):
+        pass
+
+
+class _watchdogWatcher():
+    #Event based (inotify on linux etc.) - needs the optional watchdog package.
+    kind = "watchdog"
+
+    @staticmethod
+    def available():
+        try:
+            import watchdog.observers
+            return True
+        except ImportError:
+            return False
+
+    def __init__(self, holder):
+        import watchdog.observers
+        import watchdog.events
+
+        self.flag = threading.Event()
+        watcher = self
+
+        class handler(watchdog.events.FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')]
+                for p in paths:
+                    if p and holder.fileMatches(p):
+                        watcher.flag.set()
+
+        self.observer = watchdog.observers.Observer()
+        self.observer.schedule(handler(), holder.cwd, recursive=holder.recursive)
+        self.observer.start()
+
+    def changed(self):
+        changed = self.flag.is_set()
+        self.flag.clear()
+        return changed
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def _asFloats(a):
+    #numbers as floats, dates as nanoseconds, anything else as its position
+    a = np.asarray(a)
+    if np.issubdtype(a.dtype, np.number):
+        return a.astype(float)
+    if np.issubdtype(a.dtype, np.datetime64):
+        return a.astype('datetime64[ns]').astype('int64').astype(float)
+    return np.arange(len(a), dtype=float)
+
+def lttbIndices(x, y, n_out):
+    #Largest triangle three buckets - row indices of n_out points that keep the look of the line.
+    #First and last points are always kept, one point per bucket in between:
+    #the one making the biggest triangle with the last kept point and the next bucket's average.
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _asFloats(x)
+    y = _asFloats(y)
+
+    edges = np.linspace(1, n-1, n_out-1).astype(int) ##n_out-2 buckets between the first and last points
+    #average of each bucket (ignoring nans) - the last 'bucket' is just the last point
+    starts = np.append(edges, n)[:-1]
+    with np.errstate(all='ignore'): ##all-nan buckets just give nan
+        avg_x = np.add.reduceat(np.nan_to_num(x), starts) / np.add.reduceat(~np.isnan(x), starts)
+        avg_y = np.add.reduceat(np.nan_to_num(y), starts) / np.add.reduceat(~np.isnan(y), starts)
+
+    out = np.empty(n_out, dtype=int)
+    out[0] = 0
+    out[-1] = n-1
+    a = 0
+    for i in range(n_out-2):
+        lo, hi = edges[i], edges[i+1]
+        with np.errstate(all='ignore'):
+            area = np.abs((x[a]-avg_x[i+1])*(y[lo:hi]-y[a]) - (x[a]-x[lo:hi])*(avg_y[i+1]-y[a]))
+        a = lo + np.argmax(np.fmax(area, -1.0)) ##fmax turns nans into -1
+        out[i+1] = a
+    return out
+
+def aggregateLines(lines, n_points=200, stat="mean", band="minmax", log=False):
+    #Statistics across lines [(x, y), ...] - each is interpolated onto n_points x values
+    #(spread over all of them, evenly on a log axis if log), then it's done a column at a time.
+    #Lines only count where they have data - there's no extrapolating past their ends.
+    #stat - 'mean' or 'median', band - 'minmax', 'std' or (low, high) percentiles
+    #Returns x, the stat, and the bottom and top of the band.
+    lines = [(_asFloats(x), _asFloats(y)) for x, y in lines]
+    lines = [(x[np.isfinite(x) & np.isfinite(y)], y[np.isfinite(x) & np.isfinite(y)]) for x, y in lines]
+    lines = [(x, y) for x, y in lines if len(x)]
+    if not lines:
+        empty = np.array([])
+        return empty, empty, empty, empty
+
+    low = min(x.min() for x, y in lines)
+    high = max(x.max() for x, y in lines)
+    if log and low > 0:
+        grid = np.geomspace(low, high, n_points)
+    else:
+        grid = np.linspace(low, high, n_points)
+
+    values = np.empty((len(lines), len(grid)))
+    for i, (x, y) in enumerate(lines):
+        order = np.argsort(x, kind='stable')
+        values[i] = np.interp(grid, x[order], y[order], left=np.nan, right=np.nan)
+    covered = ~np.all(np.isnan(values), axis=0) ##(only matters for lines that don't all span the same x)
+    grid = grid[covered]
+    values = values[:, covered]
+    #the nan skipping versions are a lot slower (percentiles especially) - only use them if needed
+    gaps = np.isnan(values).any()
+    mean, median, std = (np.nanmean, np.nanmedian, np.nanstd) if gaps else (np.mean, np.median, np.std)
+    percentile, vmin, vmax = (np.nanpercentile, np.nanmin, np.nanmax) if gaps else (np.percentile, np.min, np.max)
+
+    if stat == "mean":
+        centre = mean(values, axis=0)
+    elif stat == "median":
+        centre = median(values, axis=0)
+    else:
+        raise ValueError(f"Unknown aggregate stat {stat}, should be 'mean' or 'median'")
+
+    if band == "minmax":
+        lower, upper = vmin(values, axis=0), vmax(values, axis=0)
+    elif band == "std":
+        spread = std(values, axis=0)
+        middle = centre if stat == "mean" else mean(values, axis=0)
+        lower, upper = middle - spread, middle + spread
+    else:
+        lower, upper = percentile(values, band, axis=0)
+    return grid, centre, lower, upper
+
+def minmaxIndices(y, n_out):
+    #Row indices of the min and max of y in each of n_out/2 buckets - keeps every spike.
+    #(plus the first and last points)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = _asFloats(y)
+
+    buckets = (n_out-2)//2
+    size = -(-n//buckets) ##ceiling
+    padded = np.full(buckets*size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    all_nan = np.isnan(padded).all(axis=1)
+    padded[all_nan, 0] = 0 ##so the argmin/argmax don't complain - thrown away below
+    starts = np.arange(buckets)*size
+    idx = np.concatenate([
+        [0, n-1],
+        (starts + np.nanargmin(padded, axis=1))[~all_nan],
+        (starts + np.nanargmax(padded, axis=1))[~all_nan],
+    ])
+    return np.unique(idx[idx < n]) ##sorted, no repeats
+
+def exportImages(holders, directory=".", formats=("png",), **kwargs):
+    #Write static images for a batch of plotted plotHolders - one per holder per format,
+    #named after the holder's title. kwargs (width, height, scale...) go to plotly's image writer.
+    #Returns the paths written.
+    figs = []
+    paths = []
+    for i, holder in enumerate(holders):
+        name = re.sub(r'[^\w\-. ]', '_', holder.title or f"plot{i}")
+        for fmt in formats:
+            figs.append(holder.fig)
+            paths.append(os.path.join(directory, f"{name}.{fmt}"))
+
+    if kaleidoVersion() >= (1,) and hasattr(plotly.io, "write_images"):
+        plotly.io.write_images(figs, paths, **kwargs) ##kaleido 1+ does the lot in one go
+    else:
+        for fig, path in zip(figs, paths):
+            fig.write_image(path, **kwargs)
+    return paths
+
+def kaleidoVersion():
+    #The installed kaleido's version as a tuple of ints, e.g. (1, 0, 0) - () if it isn't installed
+    import importlib.metadata
+    try:
+        version = importlib.metadata.version("kaleido")
+    except importlib.metadata.PackageNotFoundError:
+        return ()
+    return tuple(int(part) for part in re.findall(r"\d+", version)[:3])
+
+def _compactArrays(obj):
+    #Swap binary encoded float64 arrays in a figure dict for float32 ones
+    if isinstance(obj, dict):
+        if obj.get('dtype') == 'f8' and 'bdata' in obj:
+            values = np.frombuffer(base64.b64decode(obj['bdata']), dtype='<f8').astype('<f4')
+            return dict(obj, dtype='f4', bdata=base64.b64encode(values.tobytes()).decode('ascii'))
+        return {k: _compactArrays(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_compactArrays(v) for v in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype == np.float64:
+        return obj.astype(np.float32) ##older plotly - still numpy here
+    return obj
+
+def fileSignature(f):
+    #(modified time, size) of a file - None if it's gone
+    try:
+        st = os.stat(f)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class traceRecord():
+    #One line - its numbers as numpy arrays of its own (contiguous float64, see traceArray), so the
+    #dataframe they came from isn't kept alive, and the rest of its Scatter arguments.
+    #Can be used like the Scatter arguments dict - trace['name'], trace.get('yaxis'), 'error_y' in trace
+    #(e.g. in trace_filter and facet functions), and .scatterArgs() gives that dict, sharing the arrays.
+    #split is the append_name_string of the split the line came from ("" if the file wasn't split) - not passed to Scatter.
+    __slots__ = ('x', 'y', 'name', 'meta', 'error_y', 'error_x', 'split', 'options')
+    fields = __slots__[:-1]
+
+    def __init__(self, x, y, name, meta, error_y=None, error_x=None, split="", **options):
+        self.x = traceArray(x)
+        self.y = traceArray(y)
+        self.name = name
+        self.meta = meta
+        self.error_y = error_y
+        self.error_x = error_x
+        self.split = split
+        self.options = options ##anything else for Scatter - mode, marker...
+
+    def scatterArgs(self, **extra):
+        args = dict(x=self.x, y=self.y, name=self.name, showlegend=True, meta=self.meta)
+        args.update(self.options)
+        if self.error_y is not None:
+            args['error_y'] = self.error_y
+        if self.error_x is not None:
+            args['error_x'] = self.error_x
+        args.update(extra)
+        return args
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.options[key]
+
+    def __setitem__(self, key, value):
+        if key in self.fields:
+            setattr(self, key, value)
+        else:
+            self.options[key] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def nbytes(self):
+        #Bytes of numbers held
+        arrays = [self.x, self.y]
+        for error in (self.error_y, self.error_x):
+            if error is not None:
+                arrays += [error['array'], error['arrayminus']]
+        return sum(a.nbytes for a in arrays)
+
+def traceArray(values):
+    #values (a column, list...) as a numpy array that owns its data - contiguous float64 if they're numbers.
+    #Only copies if it has to - but a column of a dataframe always is, so the dataframe can be freed.
+    a = values.to_numpy() if hasattr(values, 'to_numpy') else np.asarray(values)
+    if a.dtype.kind in 'iuf':
+        a = np.ascontiguousarray(a, dtype=np.float64)
+    if a.base is not None:
+        a = a.copy()
+    return a
+
+def axisName(axis, index):
+    #plotly's name for the index'th x/y axis - 'x', 'x2', 'x3'...
+    return axis if index == 1 else f"{axis}{index}"
+
+def errorBand(spec, fillcolor):
+    #Scatter arguments for a shaded band around a line, from the line's error_y arrays.
+    #It's a closed shape - along the top from start to end, then back along the bottom.
+    x = np.asarray(spec['x'])
+    y = np.asarray(spec['y'], dtype=float)
+    upper = y + np.asarray(spec['error_y']['array'], dtype=float)
+    lower = y - np.asarray(spec['error_y']['arrayminus'], dtype=float)
+    return dict(
+        x = np.concatenate([x, x[::-1]]), ##goes from start to end to start - closed loop
+        y = np.concatenate([upper, lower[::-1]]), #stitches the top bars all around to the bottom ones
+        fill = 'toself',##good for a closed shape... note it will 'cancel out' if a single trace covers same area twice
+        fillcolor = fillcolor, ##transparentish
+        mode = 'none', ##forces no lines..
+        name=spec['name']+"_eband", ##
+        hoverinfo = "skip", ##prevent it being displayed
+        showlegend = True, ##appear in legend
+        meta = spec['meta'], ##copy metadata for later grouping.
+        **{axis: spec[axis] for axis in ('xaxis', 'yaxis') if axis in spec} ##same panel as its line
+    )
+
+def _picklable(*objs):
+    try:
+        pickle.dumps(objs)
+        return True
+    except Exception:
+        return False
+
+class plotReport():
+    #What happened during a .plot - where the time went, how much got plotted, peak memory.
+    #   holder.report.stages   {stage: seconds}
+    #   holder.report.files    [{'path', 'read_seconds', 'preprocess_seconds', 'rows', 'cache_hit', 'error'}, ...]
+    #   holder.report.counts   {'files', 'lines', 'points', 'rows'}
+    #   holder.report.peak_memory   bytes - this plot's peak python allocations, if trace_memory (else None)
+    #   holder.report.process_peak_rss   bytes - the process's highest resident memory so far (not just this plot)
+    #   print(holder.report.summary())
+
+    #The stages timed with .stage, so can be profiled (traces and ebands are added up per line, with .add)
+    profile_stages = ('plot', 'discovery', 'store', 'ingest', 'aggregate', 'figure', 'layout')
+
+    def __init__(self, callback=None, profile_stage=None, trace_memory=False):
+        self.stages = {}
+        self.files = []
+        self.counts = {'files': 0, 'lines': 0, 'points': 0, 'rows': 0}
+        self.peak_memory = None
+        self.process_peak_rss = None
+        self.profiles = {}
+        self.callback = callback
+        self.profile_stage = profile_stage
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        else:
+            self._started_tracing = False
+            if trace_memory:
+                tracemalloc.reset_peak() ##already tracing - just this plot's peak
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        #time (and maybe profile) a block of work as stage name
+        profiler = None
+        if self.profile_stage == name:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                import pstats
+                self.profiles[name] = pstats.Stats(profiler)
+            self.add(name, seconds)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+        if self.callback is not None:
+            self.callback(name, seconds, self)
+
+    def addFile(self, f, info, exception=None):
+        self.files.append({
+            'path': f,
+            'read_seconds': info.get('read_seconds'),
+            'preprocess_seconds': info.get('preprocess_seconds'),
+            'rows': info.get('rows'),
+            'cache_hit': info.get('cache_hit'),
+            'error': None if exception is None else repr(exception),
+        })
+        self.counts['rows'] += info.get('rows') or 0
+
+    def finish(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+        self.process_peak_rss = _processPeakMemory()
+
+    def asDict(self):
+        return {'stages': dict(self.stages), 'files': list(self.files), 'counts': dict(self.counts),
+            'peak_memory': self.peak_memory, 'process_peak_rss': self.process_peak_rss}
+
+    def summary(self):
+        lines = [f"{'stage':<12} {'seconds':>9}"]
+        lines += [f"{name:<12} {seconds:>9.3f}" for name, seconds in self.stages.items()]
+        read = sum(f['read_seconds'] or 0 for f in self.files)
+        preprocess = sum(f['preprocess_seconds'] or 0 for f in self.files)
+        lines.append(f"per file (summed over workers): read_csv {read:.3f}s, split/preprocess {preprocess:.3f}s")
+        slowest = sorted(self.files, key=lambda f: (f['read_seconds'] or 0) + (f['preprocess_seconds'] or 0))[-3:]
+        for f in reversed(slowest):
+            lines.append(f"  slow: {os.path.basename(f['path'])} {(f['read_seconds'] or 0) + (f['preprocess_seconds'] or 0):.3f}s, {f['rows']} rows")
+        lines.append(f"{self.counts['files']} files, {self.counts['rows']} rows read, "
+            f"{self.counts['lines']} lines, {self.counts['points']} points")
+        if self.peak_memory is not None:
+            lines.append(f"peak memory {self.peak_memory/1e6:.1f} MB")
+        if self.process_peak_rss is not None:
+            lines.append(f"process peak RSS so far {self.process_peak_rss/1e6:.1f} MB")
+        for name, stats in self.profiles.items():
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(20)
+            lines.append(f"profile of {name}:\n{out.getvalue()}")
+        return "\n".join(lines)
+
+def _processPeakMemory():
+    #peak resident memory of this process in bytes, if the OS says (not on windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak*1024 ##macs say bytes, linux kB
+
+
+class frameCache():
+    #On-disk cache of pd.read_csv results - one file per entry in directory.
+    #Plain data only, so it can be sent to worker processes too.
+
+    formats = {'pickle': '.pkl', 'parquet': '.parquet', 'feather': '.feather'}
+
+    def __init__(self, directory, max_bytes=1e9, fmt="pickle"):
+        if fmt not in self.formats:
+            raise ValueError(f"Unknown cache format {fmt}, should be one of {list(self.formats)}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+
+    def entryPath(self, f, read_kwargs=None):
+        #Where the entry for this file (as it is right now) lives
+        st = os.stat(f)
+        key = repr((os.path.abspath(f), st.st_mtime_ns, st.st_size, sorted((read_kwargs or {}).items())))
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + self.formats[self.fmt])
+
+    def read(self, f, read_kwargs=None):
+        #Returns (dataframe, hit) - reading the csv and storing it if it isn't cached yet.
+        entry = self.entryPath(f, read_kwargs)
+        if os.path.exists(entry):
+            try:
+                df = self._load(entry)
+                os.utime(entry) ##bump it, for least recently used eviction
+                return df, True
+            except Exception:
+                pass ##half written or corrupt - just read the csv again
+
+        df = readCsv(f, read_kwargs)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{entry}.{os.getpid()}.tmp" ##so other workers never see half an entry
+            self._save(df, tmp)
+            os.replace(tmp, entry)
+        except Exception as e:
+            log.warning(f"Couldn't cache {f} => {type(e)} , with {e.args}")
+        return df, False
+
+    def evict(self):
+        #Remove the least recently used entries until under max_bytes
+        if not os.path.isdir(self.directory):
+            return
+        entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        entries.sort(key=lambda e: e.stat().st_mtime) ##oldest first
+        total = sum(e.stat().st_size for e in entries)
+        for e in entries:
+            if total <= self.max_bytes:
+                break
+            total -= e.stat().st_size
+            os.remove(e.path)
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for e in os.scandir(self.directory):
+                if e.is_file():
+                    os.remove(e.path)
+
+    def _save(self, df, path):
+        if self.fmt == "parquet":
+            df.to_parquet(path)
+        elif self.fmt == "feather":
+            df.to_feather(path)
+        else:
+            df.to_pickle(path)
+
+    def _load(self, path):
+        if self.fmt == "parquet":
+            return pd.read_parquet(path)
+        elif self.fmt == "feather":
+            return pd.read_feather(path)
+        return pd.read_pickle(path)
+
+class runStore():
+    #A whole run directory's csv files in one parquet file (needs pyarrow).
+    #Every row has a _source_file column (the csv's path, relative to root), and the file's metadata
+    #lists each csv's (modified time, size, columns) - so updating it only reads new or changed csvs,
+    #and reading only decodes the row groups of the files asked for.
+    #
+    #   store = runStore("run.parquet")
+    #   store.update(files)                 ##read new/changed csvs in
+    #   store.frames(files)                 ##{path: dataframe}, as if read from the csvs
+
+    source_column = "_source_file"
+    metadata_key = b"scripty_plotter"
+    row_group_size = 65536
+
+    def __init__(self, path, root="."):
+        self.path = path
+        self.root = root
+
+    def relative(self, f):
+        return os.path.relpath(f, self.root)
+
+    def metadata(self):
+        #What's in the store - {'files': {relative path: [mtime_ns, size, columns]}, 'options': ...}
+        if not os.path.exists(self.path):
+            return {'files': {}, 'options': None}
+        import pyarrow.parquet
+        schema_metadata = pyarrow.parquet.read_schema(self.path).metadata or {}
+        return json.loads(schema_metadata.get(self.metadata_key, b'{"files": {}, "options": null}'))
+
+    def files(self):
+        return self.metadata()['files']
+
+    def update(self, files, read_kwargs=None, workers=None):
+        #Bring the store up to date with files - reading the new or changed ones,
+        #and dropping stored files that have been deleted. Files not listed but still there are kept.
+        #Returns (files read, files kept, files dropped)
+        metadata = self.metadata()
+        stored = metadata['files']
+        options = repr(sorted((read_kwargs or {}).items()))
+        if stored and metadata['options'] != options:
+            log.info(f"Reader options have changed - rebuilding {self.path}")
+            stored = {}
+
+        current = {}
+        for f in files:
+            signature = fileSignature(f)
+            if signature is not None:
+                current[self.relative(f)] = (f, signature)
+
+        keep = {}
+        for rel, entry in stored.items():
+            f, signature = current.get(rel) or (None, fileSignature(os.path.join(self.root, rel)))
+            if signature is not None and list(signature) == entry[:2]:
+                keep[rel] = entry
+        to_read = [(rel, f) for rel, (f, signature) in current.items() if rel not in keep]
+        dropped = len([rel for rel in stored if rel not in keep and rel not in current])
+        if not to_read and len(keep) == len(stored) and os.path.exists(self.path):
+            log.info(f"{self.path} is up to date ({len(keep)} files)")
+            return 0, len(keep), 0
+
+        def read(f):
+            try:
+                return readCsv(f, read_kwargs)
+            except Exception as e:
+                log.warning(f"Couldn't put {f} in the store => {type(e)} , with {e.args}")
+                return None
+        if workers and workers > 1 and len(to_read) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                read_frames = list(executor.map(read, [f for rel, f in to_read]))
+        else:
+            read_frames = [read(f) for rel, f in to_read]
+
+        import pyarrow
+        import pyarrow.parquet
+        tables = {}
+        if keep:
+            tables[None] = pyarrow.parquet.read_table(self.path, filters=None if len(keep) == len(stored) else
+                [(self.source_column, 'in', list(keep))])
+        for (rel, f), df in zip(to_read, read_frames):
+            if df is None:
+                continue ##not stored, so it gets another go next time
+            df = df.assign(**{self.source_column: rel})
+            try:
+                try:
+                    tables[rel] = pyarrow.Table.from_pandas(df, preserve_index=False)
+                except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError): ##a column mixing text and numbers
+                    mixed = df.select_dtypes('object').columns
+                    tables[rel] = pyarrow.Table.from_pandas(
+                        df.astype({c: str for c in mixed}).where(df.notna()), preserve_index=False)
+            except Exception as e:
+                log.warning(f"Couldn't put {f} in the store => {type(e)} , with {e.args}")
+                continue
+            keep[rel] = list(current[rel][1]) + [[str(c) for c in df.columns]]
+
+        tables = self._unify(tables, keep)
+        if tables:
+            table = _concatTables(list(tables.values()))
+        else:
+            table = pyarrow.table({self.source_column: pyarrow.array([], pyarrow.string())})
+        #sorted by file, so each row group only holds a few files - and reads skip the rest
+        table = table.sort_by(self.source_column)
+        self._write(table, {'files': keep, 'options': options})
+        stored_new = len([rel for rel in tables if rel is not None])
+        log.info(f"Stored {stored_new} new/changed files in {self.path} ({len(keep)} files, {dropped} dropped)")
+        return stored_new, len(keep) - stored_new, dropped
+
+    def _unify(self, tables, keep):
+        #Make the files' columns fit together - a column that is text in one file and numbers in
+        #another is stored as text for all of them (numbers of different kinds are widened when joined).
+        #A file that still won't fit is logged and left out (and out of keep).
+        import pyarrow
+        types = {}
+        for table in tables.values():
+            for field in table.schema:
+                types.setdefault(field.name, set()).add(field.type)
+        is_text = lambda t: pyarrow.types.is_string(t) or pyarrow.types.is_large_string(t)
+        as_text = [name for name, found in types.items()
+            if any(is_text(t) for t in found) and not all(is_text(t) or pyarrow.types.is_null(t) for t in found)]
+        if not as_text:
+            return tables
+
+        unified = {}
+        for rel, table in tables.items():
+            try:
+                for name in as_text:
+                    if name in table.column_names and not is_text(table.schema.field(name).type):
+                        i = table.column_names.index(name)
+                        table = table.set_column(i, name, table.column(name).cast(pyarrow.string()))
+                unified[rel] = table
+            except Exception as e:
+                if rel is None:
+                    raise ##the store itself
+                log.warning(f"Couldn't put {rel} in the store => {type(e)} , with {e.args}")
+                del keep[rel]
+        return unified
+
+    def frames(self, files, usecols=None, read_kwargs=None):
+        #{path: dataframe} for those files that are in the store (and up to date, if read_kwargs are
+        #given and match the store's). usecols - a columnSelector or list, as for pd.read_csv.
+        metadata = self.metadata()
+        if read_kwargs is not None and metadata['files'] and metadata['options'] != repr(sorted(read_kwargs.items())):
+            log.warning(f"{self.path} was made with different reader options - reading the csv files instead")
+            return {}
+        stored = metadata['files']
+        paths = {}
+        for f in files:
+            rel = self.relative(f)
+            if rel in stored:
+                paths[rel] = f
+        if not paths:
+            return {}
+
+        columns = None
+        if usecols is not None:
+            import pyarrow.parquet
+            wanted = usecols if callable(usecols) else set(usecols).__contains__
+            columns = [c for c in pyarrow.parquet.read_schema(self.path).names if c == self.source_column or wanted(c)]
+        df = pd.read_parquet(self.path, columns=columns, filters=[(self.source_column, 'in', list(paths))])
+
+        frames = {}
+        for rel, group in df.groupby(self.source_column, sort=False):
+            file_columns = [c for c in stored[rel][2] if c in group.columns] ##just its own columns, in its order
+            frames[paths[rel]] = group[file_columns].reset_index(drop=True)
+        return frames
+
+    def _write(self, arrow_table, metadata):
+        import pyarrow.parquet
+        schema_metadata = dict(arrow_table.schema.metadata or {})
+        schema_metadata[self.metadata_key] = json.dumps(metadata).encode()
+        arrow_table = arrow_table.replace_schema_metadata(schema_metadata)
+        tmp = f"{self.path}.{os.getpid()}.tmp" ##so a plot never sees half a store
+        pyarrow.parquet.write_table(arrow_table, tmp, row_group_size=self.row_group_size)
+        os.replace(tmp, self.path)
+
+def _concatTables(tables):
+    #pyarrow.concat_tables, filling in missing columns and widening numbers (int + float etc.)
+    import pyarrow
+    try:
+        return pyarrow.concat_tables(tables, promote_options="permissive")
+    except TypeError: ##pyarrow < 14
+        return pyarrow.concat_tables(tables, promote=True)
+
+
 def noop(dataframe):
     #print(type(dataframe))
     return dataframe.copy(deep=True)
@@ -404,6 +2102,188 @@ def do_not_split(df):
     rd[''] = df ##so '' gets appended = nothings
     return rd
 
+##Built in split/custom column functions.
+#Set up as objects rather than lambdas, so they can be sent to worker processes
+#(plotHolder.worker_type = "process"), and they say what columns they need (for usecols="auto").
+#Each does its work across the whole dataframe at once, and never changes the one it's given.
+#   bob.split_dataset_function = splitByColumn('LP-Test Name', {'Up': '_u', 'Down': '_d'})
+#   bob.custom_column_function = chain(ratioColumn('MEAN-Adc', 'REF-I', kind='percent'),
+#                                      rollingStat('MEAN-Adc_percent', 5))
+
+class splitByColumn():
+    #Split on the value in a column - names maps values to the text appended to the line name
+    #(only those values are kept, in that order). Without names, every value is kept as "_value".
+    def __init__(self, column, names=None):
+        self.column = column
+        self.names = names
+        self.columns = [column]
+
+    def __call__(self, df):
+        groups = dict(tuple(df.groupby(self.column, sort=False))) ##one pass over the rows
+        if self.names is None:
+            return {f"_{value}": group for value, group in groups.items()}
+        return {suffix: groups[value] for value, suffix in self.names.items() if value in groups}
+
+class splitByDirection():
+    #Split a sweep by which way column is going (the sign of each step) - e.g. current up and down.
+    #Rows where it doesn't change stay with the direction before them.
+    #A sweep that never changes (or only has one row) counts as up.
+    def __init__(self, column, up='_u', down='_d'):
+        self.column = column
+        self.up = up
+        self.down = down
+        self.columns = [column]
+
+    def __call__(self, df):
+        if len(df) < 2:
+            return {self.up: df}
+        step = np.sign(np.diff(df[self.column].to_numpy(dtype=float)))
+        direction = pd.Series(np.concatenate([step[:1], step])).replace(0, np.nan).ffill().bfill().fillna(1).to_numpy()
+        result = {}
+        for sign, suffix in ((1, self.up), (-1, self.down)):
+            rows = direction == sign
+            if rows.any():
+                result[suffix] = df[rows]
+        return result
+
+class ratioColumn():
+    #Add a column comparing column against a reference column:
+    #kind 'ratio' = column/reference, 'error' = ratio-1, 'percent' = (ratio-1)*100
+    #Goes in out (default column_kind, e.g. "MEAN-Adc_percent")
+    def __init__(self, column, reference, kind='error', out=None):
+        if kind not in ('ratio', 'error', 'percent'):
+            raise ValueError(f"Unknown kind {kind}, should be 'ratio', 'error' or 'percent'")
+        self.column = column
+        self.reference = reference
+        self.kind = kind
+        self.out = out or f"{column}_{kind}"
+        self.columns = [column, reference]
+
+    def __call__(self, df):
+        with np.errstate(divide='ignore', invalid='ignore'): ##a zero reference gives inf/nan, which just doesn't plot
+            values = df[self.column].to_numpy(dtype=float) / df[self.reference].to_numpy(dtype=float)
+        if self.kind != 'ratio':
+            values = values - 1
+        if self.kind == 'percent':
+            values = values * 100
+        return df.assign(**{self.out: values})
+
+class rollingStat():
+    #Add a rolling statistic of column over window rows ('mean', 'median', 'std', 'min', 'max')
+    #Goes in out (default column_stat, e.g. "y_std")
+    def __init__(self, column, window, stat='mean', out=None, center=True):
+        self.column = column
+        self.window = window
+        self.stat = stat
+        self.out = out or f"{column}_{stat}"
+        self.center = center
+        self.columns = [column]
+
+    def __call__(self, df):
+        rolling = df[self.column].rolling(self.window, center=self.center, min_periods=1)
+        return df.assign(**{self.out: getattr(rolling, self.stat)()})
+
+class chain():
+    #Several custom column functions, one after the other.
+    def __init__(self, *functions):
+        self.functions = functions
+        self.columns = [c for fn in functions for c in getattr(fn, 'columns', ())]
+
+    def __call__(self, df):
+        for fn in self.functions:
+            df = fn(df)
+        return df
+
+#The CSS/plotly colour names - {name: hex}
+css_colours = dict(zip(*[iter("""
+aliceblue f0f8ff antiquewhite faebd7 aqua 00ffff aquamarine 7fffd4 azure f0ffff beige f5f5dc bisque ffe4c4
+black 000000 blanchedalmond ffebcd blue 0000ff blueviolet 8a2be2 brown a52a2a burlywood deb887 cadetblue 5f9ea0
+chartreuse 7fff00 chocolate d2691e coral ff7f50 cornflowerblue 6495ed cornsilk fff8dc crimson dc143c cyan 00ffff
+darkblue 00008b darkcyan 008b8b darkgoldenrod b8860b darkgray a9a9a9 darkgreen 006400 darkgrey a9a9a9
+darkkhaki bdb76b darkmagenta 8b008b darkolivegreen 556b2f darkorange ff8c00 darkorchid 9932cc darkred 8b0000
+darksalmon e9967a darkseagreen 8fbc8f darkslateblue 483d8b darkslategray 2f4f4f darkslategrey 2f4f4f
+darkturquoise 00ced1 darkviolet 9400d3 deeppink ff1493 deepskyblue 00bfff dimgray 696969 dimgrey 696969
+dodgerblue 1e90ff firebrick b22222 floralwhite fffaf0 forestgreen 228b22 fuchsia ff00ff gainsboro dcdcdc
+ghostwhite f8f8ff gold ffd700 goldenrod daa520 gray 808080 green 008000 greenyellow adff2f grey 808080
+honeydew f0fff0 hotpink ff69b4 indianred cd5c5c indigo 4b0082 ivory fffff0 khaki f0e68c lavender e6e6fa
+lavenderblush fff0f5 lawngreen 7cfc00 lemonchiffon fffacd lightblue add8e6 lightcoral f08080 lightcyan e0ffff
+lightgoldenrodyellow fafad2 lightgray d3d3d3 lightgreen 90ee90 lightgrey d3d3d3 lightpink ffb6c1
+lightsalmon ffa07a lightseagreen 20b2aa lightskyblue 87cefa lightslategray 778899 lightslategrey 778899
+lightsteelblue b0c4de lightyellow ffffe0 lime 00ff00 limegreen 32cd32 linen faf0e6 magenta ff00ff maroon 800000
+mediumaquamarine 66cdaa mediumblue 0000cd mediumorchid ba55d3 mediumpurple 9370db mediumseagreen 3cb371
+mediumslateblue 7b68ee mediumspringgreen 00fa9a mediumturquoise 48d1cc mediumvioletred c71585
+midnightblue 191970 mintcream f5fffa mistyrose ffe4e1 moccasin ffe4b5 navajowhite ffdead navy 000080
+oldlace fdf5e6 olive 808000 olivedrab 6b8e23 orange ffa500 orangered ff4500 orchid da70d6 palegoldenrod eee8aa
+palegreen 98fb98 paleturquoise afeeee palevioletred db7093 papayawhip ffefd5 peachpuff ffdab9 peru cd853f
+pink ffc0cb plum dda0dd powderblue b0e0e6 purple 800080 rebeccapurple 663399 red ff0000 rosybrown bc8f8f
+royalblue 4169e1 saddlebrown 8b4513 salmon fa8072 sandybrown f4a460 seagreen 2e8b57 seashell fff5ee
+sienna a0522d silver c0c0c0 skyblue 87ceeb slateblue 6a5acd slategray 708090 slategrey 708090 snow fffafa
+springgreen 00ff7f steelblue 4682b4 tan d2b48c teal 008080 thistle d8bfd8 tomato ff6347 turquoise 40e0d0
+violet ee82ee wheat f5deb3 white ffffff whitesmoke f5f5f5 yellow ffff00 yellowgreen 9acd32
+""".split())]*2))
+
+def parseColour(colour):
+    #(r, g, b, alpha) for a colour - '#636EFA', '#abc', 'red', 'rgb(99, 110, 250)', 'rgba(99,110,250,0.5)'
+    #or a tuple of numbers (r, g, b 0-255, alpha 0-1)
+    if isinstance(colour, (tuple, list)):
+        return tuple(float(v) for v in colour) + (1.0,)*(4-len(colour))
+    text = colour.strip().lower().replace(" ", "")
+    text = "#" + css_colours[text] if text in css_colours else text
+    if text.startswith("#"):
+        digits = text[1:]
+        if len(digits) in (3, 4):
+            digits = "".join(d*2 for d in digits)
+        if len(digits) in (6, 8):
+            values = [int(digits[i:i+2], 16) for i in range(0, len(digits), 2)]
+            return tuple(float(v) for v in values[:3]) + ((values[3]/255,) if len(values) == 4 else (1.0,))
+    elif text.startswith(("rgb(", "rgba(")) and text.endswith(")"):
+        values = [float(v) for v in text[text.index("(")+1:-1].split(",")]
+        if len(values) in (3, 4):
+            return tuple(values) + (1.0,)*(4-len(values))
+    raise ValueError(f"Don't know the colour {colour}")
+
+class colourPalette():
+    #A set of colours, each worked out just the once into an array - then colour(i, opacity) is a lookup
+    #(the 'rgba(...)' strings are made once per colour and opacity, and kept).
+    #   colourPalette(['red', '#00CC96', 'rgb(171, 99, 250)'])
+    #   colourPalette("D3")                     ##any plotly.colors.qualitative sequence
+    #   colourPalette.fromScale("Viridis", 500) ##500 colours spread along a continuous scale
+    #Indexes past the end go round again.
+
+    def __init__(self, colours):
+        if isinstance(colours, str):
+            colours = getattr(plotly.colors.qualitative, colours)
+        self.rgba = np.array([parseColour(c) for c in colours], dtype=float).reshape(-1, 4)
+        if not len(self.rgba):
+            raise ValueError("A colour palette needs at least one colour")
+        self._strings = {}
+
+    @classmethod
+    def fromScale(cls, scale, n):
+        #n colours evenly along a continuous scale - a plotly scale name ("Viridis") or list of colours
+        if isinstance(scale, str):
+            scale = plotly.colors.get_colorscale(scale)
+        elif not isinstance(scale[0], (tuple, list)) or len(scale[0]) != 2:
+            scale = plotly.colors.make_colorscale(list(scale))
+        positions = np.array([p for p, c in scale], dtype=float)
+        stops = np.array([parseColour(c) for p, c in scale], dtype=float)
+        points = np.linspace(0, 1, n) if n > 1 else np.zeros(1)
+        rgba = np.column_stack([np.interp(points, positions, stops[:, i]) for i in range(4)])
+        return cls(rgba.tolist())
+
+    def __len__(self):
+        return len(self.rgba)
+
+    def colour(self, index, opacity=None):
+        #'rgba(r, g, b, a)' for colour index - opacity replaces its own alpha if given
+        key = (index % len(self.rgba), opacity)
+        string = self._strings.get(key)
+        if string is None:
+            r, g, b, a = self.rgba[key[0]]
+            string = f"rgba({round(r)}, {round(g)}, {round(b)}, {a if opacity is None else opacity})"
+            self._strings[key] = string
+        return string
+
  # convert plotly hex colors to rgba to enable transparency adjustments
 def hex_rgba(hex, transparency):
     col_hex = hex.lstrip('#')
@@ -440,6 +2320,159 @@ def getArgs():
     print(sys.argv)
 
 
+##Command line - scripty-plotter [paths] [-c config.toml]... (see main)
+
+#Settings that name functions - what can be used in config files
+config_functions = {
+    'noop': noop, 'do_not_split': do_not_split, 'splitByColumn': splitByColumn,
+    'splitByDirection': splitByDirection, 'ratioColumn': ratioColumn, 'rollingStat': rollingStat, 'chain': chain,
+}
+
+def configFunction(value):
+    #A function from a config file - a name ("do_not_split"), a table with its type and
+    #arguments ({type = "splitByColumn", column = "LP-Test Name"}), or a list of those (chained)
+    if isinstance(value, str):
+        if value not in config_functions:
+            raise ValueError(f"Unknown function {value}, should be one of {sorted(config_functions)}")
+        return config_functions[value]
+    if isinstance(value, list):
+        return chain(*[configFunction(v) for v in value])
+    kwargs = dict(value)
+    return configFunction(kwargs.pop('type'))(**kwargs)
+
+def configValue(key, value):
+    #A config file value, as the plotHolder attribute key wants it
+    if key in ('split_dataset_function', 'custom_column_function'):
+        return configFunction(value)
+    if isinstance(value, str) and (key.endswith('_regex') or (key == 'facet' and value != 'split')):
+        return re.compile(value)
+    if key == 'limits_dict' and value:
+        return {name: tuple(xy) for name, xy in value.items()}
+    return value
+
+def readConfig(path):
+    #A TOML (.toml) or YAML (.yaml/.yml, needs pyyaml) plot config - returns a list of settings dicts.
+    #Top level settings are plotHolder attributes; a [[plot]] list makes several figures,
+    #each with its own settings on top of the top level ones.
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+        with open(path, encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    else:
+        try:
+            import tomllib
+        except ImportError: ##python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    plots = config.pop('plot', None) or [{}]
+    return [dict(config, **plot) for plot in plots]
+
+def configHolder(settings, cwd=None, files=None):
+    #A plotHolder from a settings dict (see readConfig), for directory cwd or a list of files
+    holder = plotHolder()
+    known = vars(holder) ##the settings - not the methods
+    for key, value in settings.items():
+        if key not in known or key.startswith('_'):
+            raise ValueError(f"Unknown setting {key}")
+        setattr(holder, key, configValue(key, value))
+    if files:
+        holder.fileList = sorted(files, key=lambda f: os.stat(f).st_mtime_ns) ##oldest first, as getFileList
+        holder.cwd = os.path.dirname(files[0]) or "."
+    elif cwd != None:
+        holder.cwd = cwd
+    return holder
+
+def main(argv=None):
+    #scripty-plotter - plot directories (or files) of csvs from the command line.
+    #One figure per config (per plot in it) per directory - files given by name all go in one figure.
+    import argparse
+    parser = argparse.ArgumentParser(prog="scripty-plotter",
+        description="Plot directories of csv files - each directory (or the files given) gets a html figure per plot config.")
+    parser.add_argument("paths", nargs="*", help="directories or csv files (default: the config's cwd, or here)")
+    parser.add_argument("-c", "--config", action="append", default=[], help="TOML or YAML plot config (can repeat)")
+    parser.add_argument("-x", "--x-col", help="x column")
+    parser.add_argument("-y", "--y-col", help="y column")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="figures made in parallel worker processes")
+    parser.add_argument("-o", "--output-dir", default=".", help="where the html files go")
+    parser.add_argument("--cache-dir", help="cache parsed files here (see plotHolder.cache_dir)")
+    parser.add_argument("--profile", nargs="?", const="plot", metavar="STAGE", choices=plotReport.profile_stages,
+        help="profile a stage (default: the whole plot) and print the top functions - runs one figure at a time."
+            f" One of {', '.join(plotReport.profile_stages)}")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    settings_list = []
+    for path in args.config:
+        try:
+            settings_list += readConfig(path)
+        except Exception as e:
+            parser.error(f"Couldn't read {path} => {e}")
+    settings_list = settings_list or [{}]
+    for settings in settings_list:
+        if args.x_col:
+            settings['x_col'] = args.x_col
+        if args.y_col:
+            settings['y_col'] = args.y_col
+        if args.cache_dir:
+            settings['cache_dir'] = args.cache_dir
+        if args.profile:
+            settings['profile_stage'] = args.profile
+
+    directories = [p for p in args.paths if os.path.isdir(p)]
+    files = [p for p in args.paths if not os.path.isdir(p)]
+    for f in files:
+        if not os.path.isfile(f):
+            parser.error(f"No such file or directory: {f}")
+
+    holders = []
+    os.makedirs(args.output_dir, exist_ok=True)
+    used = set()
+    for settings in settings_list:
+        targets = [(d, None) for d in directories] + ([(None, files)] if files else [])
+        for cwd, file_list in targets or [(None, None)]:
+            try:
+                holder = configHolder(settings, cwd, file_list)
+            except (ValueError, TypeError, KeyError) as e:
+                parser.error(f"Bad config => {e!r}")
+            target = os.path.basename(os.path.abspath(cwd or holder.cwd))
+            if holder.title == None and (cwd or file_list):
+                holder.title = target
+            stem = os.path.splitext(os.path.basename(holder.out_file or ""))[0] or \
+                re.sub(r'[^\w\-. ]', '_', holder.title or "plot")
+            if len(targets) > 1 and stem != target:
+                stem = f"{target}_{stem}" ##which directory it is
+            name, n = stem, 1
+            while name in used:
+                n += 1
+                name = f"{stem}_{n}"
+            used.add(name)
+            holder.out_file = os.path.join(args.output_dir, name + ".html")
+            holders.append(holder)
+
+    session = plotSession(holders)
+    session.workers = None if args.profile else args.jobs
+    start = time.perf_counter()
+    out_files = session.run()
+    wall = time.perf_counter() - start
+
+    if args.profile:
+        for holder in holders:
+            stats = holder.report.profiles.get(args.profile)
+            if stats is not None:
+                print(f"\n{holder.out_file} - {args.profile}")
+                stats.stream = sys.stdout
+                stats.sort_stats("cumulative").print_stats(15)
+
+    print(f"\n{'figure':<40} {'files':>6} {'lines':>6} {'points':>9} {'plot s':>7} {'draw s':>7}")
+    for out_file, report in zip(out_files, session.reports):
+        counts, stages = report['counts'], report['stages']
+        print(f"{os.path.basename(out_file):<40} {counts['files']:>6} {counts['lines']:>6} {counts['points']:>9}"
+            f" {stages.get('plot', 0):>7.2f} {stages.get('draw', 0):>7.2f}")
+    print(f"{len(out_files)} figures in {wall:.2f}s")
+    return 0
+
+
 
 
 
@@ -472,34 +2505,36 @@ out_file_name = "200a_updown_collated.csv" #Could make it run off the current WD
 #include only the files that match this regex:
 #file_name_match_regex = re.compile(".*summary\.csv")
 
+#only rows with an 'LP-Test Name' matching this are used
+row_match_regex = re.compile("^(Up|Down)$")
+
 #typically strip some of file name to get a shorter column name:
-#file_name_to_column_name_regex = re.compile(".+?(?=__)|(^.*)_summary") ##i.e. keep only stuff left of a __ or a summary if there is no __
+file_name_to_column_name_regex = re.compile(".+?(?=__)|.+?(?=_summary)") ##i.e. keep only stuff left of a __ or a summary if there is no __
 
+#the columns that identify a row - rows from each file are matched up on these.
+row_identifier_columns = ['LP-Test Name', 'LP-Current']
 
 
-#formula to return data - called once per row of data.
-#Passed a dict (the labelled row from the csv file) (also includes '_filetitle')
-#Returns a dict, which will be combined with the rest for that column.
-    #Special key '_row_identifier' is a dict that gets matched with the rows returned by get_row_scaffold
+
+#formula to return data - called once, on the rows from every file at once (as a dataframe)
+#The rows include a '_filetitle' column, with the file they came from.
+#Returns a series - one value per row, named for the output columns (name + "__" + file).
 
 ##In this case goes straight to calculating the percentage error vs the reference
-def dataExtract(in_dict):
-    row_identifier = {'LP-Test Name':in_dict.get('LP-Test Name', 'ERROR'), 
-    'LP-Current':float(in_dict.get('LP-Current', 'NA'))}
+def dataExtract(df):
+    ref_i = pd.to_numeric(df["REF-I"], errors='coerce')
+    dut_i = pd.to_numeric(df["MEAN-Adc"], errors='coerce')
 
-    ref_i = float(in_dict.get("REF-I", 'nan'))
-    dut_i = float(in_dict.get("MEAN-Adc", 'nan'))
-    
-    if "REVERSEDI" in in_dict.get('_filetitle', 'ERROR'):
-        ref_i = -ref_i
+    reversed_i = df['_filetitle'].str.contains("REVERSEDI", regex=False)
+    ref_i = ref_i.where(~reversed_i, -ref_i)
 
-    return {'I_error': (dut_i/ref_i)-1, '_row_identifier':row_identifier}
+    return ((dut_i/ref_i)-1).rename('I_error')
 
 
 
 #Function to get row scaffold, as a list of dicts (one dict per row)
 #The rows will be matched against it for validity (to figure out which one to put each file's data in)
-#Note formats should match with dataExtract!
+#Note formats should match with the row_identifier_columns in the files!
 def get_row_scaffold():
 
     currents_list = [0.1,0.5,1.0,3.0,10.0,30.0,50.0,75.0,100.0,150.0,180.0,200.0]
@@ -518,12 +2553,12 @@ def get_row_scaffold():
     return return_list_o_dicts
 
 
-#formula that returns true if the row should be used:
+#formula that returns which rows should be used (a boolean series):
 #Can also probably make all pass if sufficient sorting above
 
-def rowValidate(in_dict):
+def rowValidate(df):
     
-    return row_match_regex.match(in_dict.get("LP-Test Name","NA_ERROR"))
+    return df["LP-Test Name"].astype(str).str.match(row_match_regex)
 
 
 
@@ -536,50 +2571,61 @@ def rowValidate(in_dict):
 
 
 
-def filesToDict(files):
-
-    list_of_row_dicts = get_row_scaffold()
-    for f in files:
-
-        with open(f, newline='') as csvfile:
-            ##fieldnames are automatically taken from first row if not specified.
-            dictreader = csv.DictReader(csvfile, delimiter = ',') 
-
-            column_identifier = file_name_to_column_name_regex.search(f).group(0)
-
-            
-            for row in (r for r in dictreader if rowValidate(r)):
-                row.update({"_filetitle": f})
-                ##each row reduced to ONE value, which is put into the dict_of_all_data
-                row_data = dataExtract(row)
-                row_identifier = row_data.pop('_row_identifier')
-
-                row_name, row_value = row_data.popitem() #typically the rest lost.
-                row_name =  row_name +"__"+ column_identifier         
-
-                for i in list_of_row_dicts: #not optimal but fast enough.
-                    if row_identifier.items() <= i.items():
-                        #if the identfier is a subset (matches) - take the first one.
-                        i.update({row_name: row_value})
-                        break
-    
-    return list_of_row_dicts
-
-                    
+def collateFiles(files, extract_function=dataExtract, scaffold_function=get_row_scaffold,
+    validate_function=rowValidate, id_columns=row_identifier_columns,
+    column_name_regex=file_name_to_column_name_regex, read_kwargs=None, workers=8):
+    #Collate many files into one wide dataframe - one row per row identifier,
+    #and a column per file (value name + "__" + the short file name). e.g.
+    # LP-Test Name, LP-Current, I_error__file1, I_error__file2,...
+    #   Up        ,  0.1      ,  0.111        , 0.1200, 
+    #Rows are laid out as per scaffold_function (None = every identifier seen, in order seen).
+    #If a file has the same identifier twice, the last one wins.
+    id_columns = list(id_columns)
+    if not files:
+        return pd.DataFrame(columns=id_columns)
+
+    #reading is most of the work, and the parser lets go of the GIL - so threads help
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or 1) as executor:
+        frames = list(executor.map(lambda f: readCsv(f, read_kwargs), files))
+
+    #then it's all one long dataframe, so validating/extracting is done once for everything
+    names = [column_name_regex.search(os.path.basename(f)).group(0) for f in files]
+    rows = pd.concat(frames, ignore_index=True)
+    file_codes = np.repeat(np.arange(len(frames)), [len(df) for df in frames])
+    rows['_file'] = file_codes
+    titles, title_codes = np.unique(np.asarray(files, dtype=str), return_inverse=True)
+    rows['_filetitle'] = pd.Categorical.from_codes(title_codes[file_codes], categories=titles)
+    rows = rows[validate_function(rows)]
+    values = extract_function(rows)
+
+    #row identifier -> output row: from the scaffold, or in the order they turn up
+    if scaffold_function is not None:
+        scaffold = pd.DataFrame(scaffold_function())[id_columns]
+    else:
+        scaffold = rows[id_columns].drop_duplicates()
+    scaffold = scaffold.reset_index(drop=True)
+
+    #match each row to its output row in one hashed join, rather than searching per row
+    keyed = pd.DataFrame({'_file': rows['_file'].to_numpy(), '_value': values.to_numpy(dtype=float)})
+    for c in id_columns:
+        keyed[c] = rows[c].to_numpy()
+    keyed = keyed.merge(scaffold.reset_index(names='_row'), on=id_columns, how='inner', sort=False)
+    keyed = keyed.drop_duplicates(['_row', '_file'], keep='last') ##last one in a file wins
+
+    data = np.full((len(scaffold), len(files)), np.nan)
+    data[keyed['_row'].to_numpy(), keyed['_file'].to_numpy()] = keyed['_value'].to_numpy()
+
+    columns = [f"{values.name}__{name}" for name in names]
+    return pd.concat([scaffold, pd.DataFrame(data, columns=columns)], axis=1)
+
+def writeCollated(collated, out_file=out_file_name):
+    ##Write out - one row per row label!
+    collated.to_csv(out_file, index=False)
+    return out_file
 
-
-
-#now have a list of dicts of form:
-#[{'LP-Current': 0.1, 'LP-Test Name': 'Up', 'I_error__mod3-cal1-repeatnextday': -0.013679792998976037, 'I_error__mod3-cal1-unfolded': -0.006499262642861936, 'I_error__mod3_cal1_200a_120v_updown_26Oct21-1707': -0.005632016824321129, 'I_error__mod3_fullsweep26Oct21-1539': -0.09139055221864001}, {'LP-Current': 0.5, 'LP-Test Name': 'Up', 'I_error__mod3-cal1-repeatnextday': -0.002611698035358323, 'I_error__mod3-cal1-unfolded': -0.0010814689468119365, 'I_error__mod3_cal1_200a_120v_updown_26Oct21-1707': -0.00142351916905481, 'I_error__mod3_fullsweep26Oct21-1539': -0.0903928460638701}, {'LP-Curr
-
-##Write out - one row per row label!
-# with open(out_file_name, 'w', newline='') as out_csvfile:
-#     column_headers = list(list_of_row_dicts[0].keys())
-#     csvwriter = csv.DictWriter(out_csvfile, fieldnames=column_headers)
-#     csvwriter.writeheader()
-
-#     for dict in list_of_row_dicts:
-#         csvwriter.writerow(dict)
+def filesToDict(files):
+    #The collated rows as a list of dicts - {'LP-Current': 0.1, 'LP-Test Name': 'Up', 'I_error__file1': ...}
+    return collateFiles(files).to_dict('records')
 
 
 
@@ -609,3 +2655,5 @@ def wittyPlot(fig, df, equation, permitted_ranges):
     #fig.write_html('first_figure.html', auto_open=True)
 
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,8 +13,16 @@ setup(
     py_modules=['scripty_plotter'],
     install_requires=[
                       'pandas',
-                      'kaleido==0.1.0.post1'                     
+                      #0.1.0.post1 needs no Chrome; 1+ (with plotly>=6.1) exports in batches - exportImages takes either
+                      'kaleido>=0.1.0.post1',
+                      'tomli; python_version < "3.11"'
                       ],
+    extras_require={
+                    'yaml': ['pyyaml'],
+                    },
+    entry_points={
+                  'console_scripts': ['scripty-plotter=scripty_plotter:main'],
+                  },
 
     classifiers=[
         'Development Status :: 3 - Alpha',